@@ -26,6 +26,9 @@ class Settings:
             self.PHOTO_STORAGE_DIR, "products")
         self.UNIT_PHOTO_DIR = os.path.join(
             self.PHOTO_STORAGE_DIR, "units")
+        # Largest accepted photo upload, in bytes
+        self.MAX_PHOTO_BYTES = int(
+            os.getenv("MAX_PHOTO_BYTES", str(15 * 1024 * 1024)))
 
         # App Settings
         self.APP_NAME = os.getenv("APP_NAME", "PartStock Auto Parts Inventory")
@@ -60,7 +63,10 @@ class Settings:
         if not self.OLX_OAUTH_CALLBACK:
             raise ValueError("OLX_OAUTH_CALLBACK is required")
 
-        self.TEMP_PHOTO_DIR = os.path.join(self.DATA_PATH, "data/temp_photos")
+        # On the photos volume, so drafts hardlink photos instead of
+        # copying them (served to OLX by the temp-server container)
+        self.TEMP_PHOTO_DIR = os.path.join(
+            self.PHOTO_STORAGE_DIR, "olx_staging")
         self.CLOUDFLARE_LINK_FILE = os.path.join(
             self.DATA_PATH, "data/cloudflare/link.txt")
 
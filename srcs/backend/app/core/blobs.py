@@ -0,0 +1,157 @@
+import errno
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.core.derivatives import (
+    SIZES, FORMATS, derivative_path, generate_derivatives,
+    make_derivatives, remove_derivatives)
+from app.core.uploads import save_upload
+
+# Photo bytes live once, in blobs/<2 hex>/<sha256>.jpg (derivatives
+# alongside). The per-product/unit paths the API serves are hardlinks
+# to them, and a blob is referenced by every ProductPhoto/UnitPhoto row
+# with its blob_hash.
+BLOB_DIR = Path(settings.PHOTO_STORAGE_DIR) / "blobs"
+_INCOMING_DIR = BLOB_DIR / "incoming"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_path(digest: str) -> Path:
+    return BLOB_DIR / digest[:2] / f"{digest}.jpg"
+
+
+def _variants(path: Path) -> list[tuple[Path, Path | None]]:
+    """(file, derivative name) pairs of a photo: the file itself and
+    each of its size/format derivatives"""
+    pairs = [(path, None)]
+    for size in SIZES:
+        for fmt in FORMATS:
+            pairs.append((derivative_path(path, size, fmt), (size, fmt)))
+    return pairs
+
+
+def link_file(src: Path, dst: Path) -> None:
+    """Make dst the same file as src, replacing dst atomically.
+
+    Hardlinks share the bytes; across filesystems (or where links
+    aren't supported) this falls back to a copy.
+    """
+    if dst.exists() and os.path.samefile(src, dst):
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.part")
+    try:
+        os.link(src, tmp)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP):
+            raise
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+    # rename() does nothing when both names are already the same file
+    # (dst linked meanwhile), the temp name would stay behind
+    tmp.unlink(missing_ok=True)
+
+
+def publish(blob: Path, dst: Path) -> None:
+    """Link a blob, and those of its derivatives that exist, to dst"""
+    for src, variant in _variants(blob):
+        if src.exists():
+            target = dst if variant is None else derivative_path(
+                dst, *variant)
+            link_file(src, target)
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _adopt(path: Path, digest: str) -> tuple[Path, bool]:
+    """Move a complete file, and the derivatives made next to it, into
+    the store under its hash.
+
+    Derivatives go first and the original last: a blob that exists
+    has all the derivatives it will get. Returns (blob, whether it is
+    new). Identical bytes already stored win and the files are dropped.
+    """
+    blob = blob_path(digest)
+    if blob.exists():
+        path.unlink()
+        remove_derivatives(path)
+        return blob, False
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    for src, variant in _variants(path)[1:]:
+        if src.exists():
+            os.replace(src, derivative_path(blob, *variant))
+    os.replace(path, blob)
+    return blob, True
+
+
+def import_file(source: Path) -> tuple[str, Path]:
+    """Store a file already on disk, copying only unseen content.
+
+    Returns (digest, blob). Like uploads, a new blob gets its
+    derivatives before it appears: those already next to `source` are
+    reused, missing ones are generated. Raises ValueError when the file
+    isn't a readable image.
+    """
+    digest = hash_file(source)
+    blob = blob_path(digest)
+    if blob.exists():
+        return digest, blob
+    _INCOMING_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _INCOMING_DIR / f"{uuid.uuid4().hex}.jpg"
+    try:
+        pairs = _variants(source)
+        for src, variant in pairs:
+            if src.exists():
+                link_file(src, tmp if variant is None
+                          else derivative_path(tmp, *variant))
+        # Served by other processes (nginx)
+        os.chmod(tmp, 0o644)
+        if not all(src.exists() for src, _ in pairs):
+            try:
+                make_derivatives(str(tmp))
+            except Exception:
+                raise ValueError(f"Not a readable image: {source}")
+        _adopt(tmp, digest)
+    except BaseException:
+        discard(tmp)
+        raise
+    return digest, blob
+
+
+async def store_upload(file: UploadFile, max_bytes: int) -> tuple[str, Path]:
+    """Stream an upload into the store, with its derivatives.
+
+    Returns (digest, blob). Bytes already stored aren't kept twice,
+    nor resized again. Derivatives are made before the blob appears,
+    so identical uploads racing each other never publish a blob
+    without them. Raises ValueError (leaving nothing behind) when the
+    content isn't a readable image.
+    """
+    incoming = _INCOMING_DIR / f"{uuid.uuid4().hex}.jpg"
+    _, digest = await save_upload(file, incoming, max_bytes)
+    if not blob_path(digest).exists():
+        try:
+            await generate_derivatives(incoming)
+        except Exception:
+            await run_in_threadpool(discard, incoming)
+            raise ValueError("Not a readable image")
+    blob, _ = await run_in_threadpool(_adopt, incoming, digest)
+    return digest, blob
+
+
+def discard(blob: Path) -> None:
+    """Remove a blob and its derivatives from the store"""
+    blob.unlink(missing_ok=True)
+    remove_derivatives(blob)
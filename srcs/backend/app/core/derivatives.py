@@ -0,0 +1,89 @@
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageOps
+
+# Derivative sizes, as the longest edge in pixels
+SIZES = {
+    "thumb": 320,
+    "medium": 1024,
+}
+# Format -> (file extension, Pillow save options)
+FORMATS = {
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("webp", {"quality": 80, "method": 4}),
+}
+
+# Resizing is CPU bound: a process pool keeps it off the event loop
+# and out of the GIL
+_pool: ProcessPoolExecutor | None = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1))
+    return _pool
+
+
+def derivative_path(original: Path, size: str, fmt: str) -> Path:
+    """EM1_1_20250101_120000.jpg -> EM1_1_20250101_120000.thumb.webp"""
+    return original.with_name(f"{original.stem}.{size}.{FORMATS[fmt][0]}")
+
+
+def is_derivative(path: Path) -> bool:
+    return any(f".{size}." in path.name for size in SIZES)
+
+
+def make_derivatives(original: str) -> None:
+    """Write every size/format of a photo next to it.
+
+    Runs in a worker process. Raises PIL.UnidentifiedImageError if the
+    original isn't a readable image.
+    """
+    path = Path(original)
+    with Image.open(path) as image:
+        # Phone photos are stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for size, edge in SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            for fmt, (_, options) in FORMATS.items():
+                target = derivative_path(path, size, fmt)
+                fd, tmp_name = tempfile.mkstemp(
+                    dir=path.parent, suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        resized.save(out, fmt.upper(), **options)
+                    os.chmod(tmp_name, 0o644)
+                    os.replace(tmp_name, target)
+                except BaseException:
+                    os.remove(tmp_name)
+                    raise
+
+
+async def generate_derivatives(original: Path) -> None:
+    """make_derivatives on the process pool"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor(), make_derivatives, str(original))
+
+
+def remove_derivatives(original: Path) -> None:
+    for size in SIZES:
+        for fmt in FORMATS:
+            derivative_path(original, size, fmt).unlink(missing_ok=True)
+
+
+def photo_variant(original: Path, size: str, accept: str) -> Path:
+    """The file to serve for ?size=, WebP when the client accepts it.
+
+    Falls back to the original for size=original and for photos
+    whose derivatives don't exist (yet).
+    """
+    if size not in SIZES:
+        return original
+    fmt = "webp" if "image/webp" in (accept or "") else "jpeg"
+    path = derivative_path(original, size, fmt)
+    return path if path.exists() else original
@@ -0,0 +1,31 @@
+import json
+from fastapi.responses import StreamingResponse
+from app.database import SessionLocal
+
+# Rows fetched per database round trip, and lines per flushed chunk
+EXPORT_BATCH = 1000
+
+
+def ndjson_response(build_query, to_dict) -> StreamingResponse:
+    """Stream a query as NDJSON, one object per line.
+
+    build_query(db) returns the query. Rows are fetched in batches with
+    yield_per and flushed every EXPORT_BATCH lines, so memory stays flat
+    whatever the table size. The stream opens its own session, which
+    outlives the request's dependencies.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            lines = []
+            for row in build_query(db).yield_per(EXPORT_BATCH):
+                lines.append(json.dumps(to_dict(row), default=str))
+                if len(lines) >= EXPORT_BATCH:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,154 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import quote
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+# Photo file names carry a timestamp and their bytes never change
+IMMUTABLE = "public, max-age=31536000, immutable"
+# For responses that may change later, like a derivative not made yet
+REVALIDATE = "public, max-age=300"
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve_under(root: Path, name: str) -> Path | None:
+    """root / name, or None when name ("../..", absolute, a symlink out)
+    leads outside root"""
+    root = root.resolve()
+    path = (root / name).resolve()
+    if not path.is_relative_to(root) or path == root:
+        return None
+    return path
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong validator from the file identity: photos are written once
+    (atomic rename) and never modified, so inode, size and mtime only
+    match for the same bytes"""
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, end) inclusive of a single-range header, None when it
+    can't be satisfied. Raises ValueError for headers we don't handle
+    (syntax errors, multiple ranges), served as the full file"""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError(header)
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+def _read_range(path: Path, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cached_file_response(request: Request, path: Path,
+                         cache_control: str = IMMUTABLE,
+                         headers: dict | None = None) -> Response:
+    """FileResponse with a strong ETag, Cache-Control and Accept-Ranges,
+    answering conditional requests (304) and single byte ranges (206)"""
+    stat = path.stat()
+    etag = file_etag(stat)
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # If-Range holding another validator: the client's copy is stale,
+    # send it all
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = _byte_range(range_header, stat.st_size)
+        except ValueError:
+            pass
+        else:
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{stat.st_size}"
+                return Response(status_code=416, headers=headers)
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                _read_range(path, start, end), status_code=206,
+                headers=headers, media_type=mimetypes.guess_type(path)[0])
+
+    return FileResponse(path, headers=headers, stat_result=stat)
+
+
+def accel_file_response(request: Request, path: Path, root: Path,
+                        cache_control: str = IMMUTABLE,
+                        headers: dict | None = None) -> Response:
+    """Hand the file transfer to nginx when it is in front.
+
+    nginx announces the internal location serving `root` in the
+    X-Photo-Accel request header. The response then only carries
+    X-Accel-Redirect and the caching headers, nginx sends the bytes and
+    handles ETag, 304 and Range itself. Requests that didn't come
+    through nginx are served by cached_file_response.
+    """
+    prefix = request.headers.get("x-photo-accel")
+    if not prefix:
+        return cached_file_response(request, path, cache_control, headers)
+    # Callers pass a path from resolve_under, inside root
+    location = prefix.rstrip("/") + "/" + quote(
+        path.resolve().relative_to(root.resolve()).as_posix())
+    return Response(headers={
+        **(headers or {}),
+        "X-Accel-Redirect": location,
+        "Cache-Control": cache_control,
+    })
@@ -0,0 +1,46 @@
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from app.search.query import encode_cursor, decode_cursor
+
+# Listing sort keys: name -> (sort field, descending). Each listing
+# maps the fields to its own columns.
+SORTS = {
+    "newest": ("id", True),
+    "oldest": ("id", False),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+}
+SORT_PATTERN = "^(" + "|".join(SORTS) + ")$"
+
+
+def parse_cursor(cursor: str | None) -> list | None:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor, 2)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def keyset_page(query, column, id_column, descending: bool,
+                after: list | None, limit: int, cursor_of):
+    """One page of `query` sorted on (column, id), and the cursor of
+    the next one (None on the last page).
+
+    `after` is the (value, id) of the previous page's last row, so
+    every page is a single indexed range scan, no OFFSET. cursor_of
+    maps a row to its (value, id).
+    """
+    if after:
+        key, last = tuple_(column, id_column), tuple_(*after)
+        query = query.filter(key < last if descending else key > last)
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column, id_column)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*cursor_of(rows[-1]))
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# scope -> (table, key column) whose max(sku_id) the sequence keeps
+# ahead of
+_SOURCES = {
+    "product": ("products", "component_ref"),
+    "unit": ("units", "year_month"),
+}
+
+
+def allocate_sku_ids(db: Session, scope: str, key: str,
+                     count: int = 1) -> int:
+    """Reserve `count` consecutive sku_ids for `key`, returns the first.
+
+    The counter is bumped with a single UPDATE ... RETURNING, which
+    takes SQLite's write lock: concurrent workers are serialized and
+    never get the same ids. The lock is held until the caller commits,
+    and a rollback returns the ids. The counter never falls behind the
+    current max(sku_id) of its table, so rows inserted without it (the
+    populate scripts, raw SQL imports) don't cause duplicate SKUs.
+    """
+    table, column = _SOURCES[scope]
+    # Index lookup on (key, sku_id), cheap enough to run every time
+    table_max = (f"(SELECT COALESCE(max(sku_id), 0) FROM {table} "
+                 f"WHERE {column} = :key)")
+    params = {"scope": scope, "key": key, "count": count}
+    last_id = db.execute(text(
+        f"UPDATE sku_sequences SET last_id = max(last_id, {table_max}) "
+        "+ :count WHERE scope = :scope AND key = :key RETURNING last_id"
+    ), params).scalar()
+
+    if last_id is None:
+        last_id = db.execute(text(f"""
+            INSERT INTO sku_sequences (scope, key, last_id)
+            SELECT :scope, :key, {table_max} + :count
+            ON CONFLICT (scope, key)
+            DO UPDATE SET last_id = max(last_id, {table_max}) + :count
+            RETURNING last_id
+        """), params).scalar()
+
+    return last_id - count + 1
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Bytes read from the upload and written to disk per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def save_upload(file: UploadFile, file_path: Path,
+                      max_bytes: int) -> tuple[int, str]:
+    """Stream an upload to `file_path`, returns its size and sha256.
+
+    The file is copied a chunk at a time into a temp file next to
+    the destination, with every disk operation on the thread pool so
+    the event loop keeps serving other requests. It only appears at
+    `file_path` once complete, via an atomic rename. Uploads over
+    `max_bytes` are rejected with 413 and leave nothing behind.
+    """
+    await run_in_threadpool(
+        file_path.parent.mkdir, parents=True, exist_ok=True)
+    fd, tmp_name = await run_in_threadpool(
+        tempfile.mkstemp, dir=file_path.parent, suffix=".part")
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Photo larger than {max_bytes / (1024 * 1024):g}MB")
+            await run_in_threadpool(_write, out, digest, chunk)
+        await run_in_threadpool(_finish, out, tmp_name, file_path)
+        return size, digest.hexdigest()
+    except BaseException:
+        out.close()
+        await run_in_threadpool(_remove, tmp_name)
+        raise
+
+
+def _write(out, digest, chunk: bytes) -> None:
+    out.write(chunk)
+    digest.update(chunk)
+
+
+def _finish(out, tmp_name: str, file_path: Path) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+    out.close()
+    # mkstemp files are private, photos are served by other processes
+    os.chmod(tmp_name, 0o644)
+    os.replace(tmp_name, file_path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -6,11 +6,17 @@ from app.database import get_db
 from app.models import Make, Model, Component, Product, Unit, ProductCompatibility
 from typing import List, Optional
 import httpx
+import asyncio
 
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 
+# Products per search page (as many as the old product search), and
+# units shown under each before linking to the product page
+SEARCH_PAGE_SIZE = 50
+SEARCH_UNITS_PER_PRODUCT = 10
+
 # Homepage/Dashboard
 
 
@@ -52,27 +58,43 @@ async def unit_form(request: Request, product_id: Optional[int] = None, db: Sess
 
 
 @router.get("/search", response_class=HTMLResponse)
-async def search_results(request: Request, q: str = ""):
+async def search_results(request: Request, q: str = "",
+                         cursor: Optional[str] = None):
     try:
         async with httpx.AsyncClient() as client:
-            # Use internal backend communication
-            products_response = await client.get(f"http://backend:8000/api/v1/search/products?q={q}")
-            units_response = await client.get(f"http://backend:8000/api/v1/search/units?q={q}")
-
-            products = products_response.json() if products_response.status_code == 200 else []
-            units = units_response.json() if units_response.status_code == 200 else []
+            # Use internal backend communication, one call for both lists.
+            # Each product brings its first units and their total, the
+            # product page lists them all
+            params = {"q": q, "limit": SEARCH_PAGE_SIZE,
+                      "units_per_product": SEARCH_UNITS_PER_PRODUCT}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get(
+                "http://backend:8000/api/v1/search", params=params)
+            page = response.json() if response.status_code == 200 else {}
+            groups = page.get("results", [])
+
+            units = [
+                dict(u, description=g["product"]["description"])
+                for g in groups for u in g["units"]
+            ]
 
         return templates.TemplateResponse("search_results.html", {
             "request": request,
             "query": q,
-            "products": products,
-            "units": units
+            "groups": groups,
+            "products": [g["product"] for g in groups],
+            "units": units,
+            "unit_total": sum(g["unit_count"] for g in groups),
+            "next_cursor": page.get("next_cursor"),
+            "did_you_mean": page.get("did_you_mean")
         })
 
     except Exception as e:
         return templates.TemplateResponse("search_results.html", {
             "request": request,
             "query": q,
+            "groups": [],
             "products": [],
             "units": [],
             "error": f"Search error: {str(e)}"
@@ -84,9 +106,11 @@ async def search_results(request: Request, q: str = ""):
 async def product_detail(request: Request, product_id: int):
     try:
         async with httpx.AsyncClient() as client:
-            # Get product details and units
-            product_response = await client.get(f"http://backend:8000/api/v1/products/{product_id}")
-            units_response = await client.get(f"http://backend:8000/api/v1/products/{product_id}/units")
+            # Get product details and units, concurrently
+            product_response, units_response = await asyncio.gather(
+                client.get(f"http://backend:8000/api/v1/products/{product_id}"),
+                client.get(f"http://backend:8000/api/v1/products/{product_id}/units")
+            )
 
             if product_response.status_code == 404:
                 raise HTTPException(
@@ -10,8 +10,18 @@ import os
 from starlette.middleware.sessions import SessionMiddleware
 from app.routes.v1 import auth as auth_api
 from app.routers.pages import auth_pages
+from app.search.index import ensure_search_index
+from app.search.fuzzy import fuzzy_index
+from app.search.suggest import suggest_index
 
 Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
+# Build the spelling dictionary and the typeahead now, not on the
+# first request; the typeahead then follows writes from a thread
+with engine.connect() as conn:
+    fuzzy_index.refresh(conn)
+    suggest_index.refresh(conn)
+suggest_index.watch(engine)
 
 app = FastAPI(title="PartStock")
 
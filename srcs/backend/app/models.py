@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 import datetime
@@ -72,10 +72,16 @@ class Product(Base):
     title = Column(String(45), nullable=False)
     title_ref = Column(String(24), nullable=True, unique=True)
     description = Column(String(150), nullable=True)
-    reference_price = Column(Integer, nullable=False)
+    reference_price = Column(Integer, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     search_text = Column(String, nullable=True, index=True)
+    # search_text lowercased (ASCII only) with punctuation as spaces, see
+    # app.search.query.normalize_key_sql; accents are left in and folded
+    # by the FTS5 tokenizer
+    search_key = Column(String, nullable=True)
+    # "Make Model" names of the compatibilities, kept by triggers
+    compat_text = Column(String, nullable=True)
     updated_search_at = Column(DateTime, nullable=True)
 
     component = relationship("Component")
@@ -85,8 +91,12 @@ class Product(Base):
         "ProductCompatibility", back_populates="product")
 
     # Unique constraint for component_ref + sku_id combination
+    # The listing's component filter followed by its keyset sorts
     __table_args__ = (
         UniqueConstraint('component_ref', 'sku_id', name='unique_product_sku'),
+        Index('ix_products_component_id', 'component_ref', 'id'),
+        Index('ix_products_component_price',
+              'component_ref', 'reference_price', 'id'),
     )
 
     def get_middle_photo_path(self):
@@ -106,7 +116,7 @@ class Unit(Base):
     sku = Column(String(10), nullable=False, unique=True)
     title_suffix = Column(String(45), nullable=True)
     alternative_sku = Column(String(100))
-    selling_price = Column(Integer, nullable=False)
+    selling_price = Column(Integer, nullable=False, index=True)
     km = Column(Integer, nullable=True)  # Motor kilometers
     observations = Column(String(150))
     # active|sold|incomplete|consume
@@ -114,6 +124,10 @@ class Unit(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow)
     search_text = Column(String, nullable=True, index=True)
+    # search_text lowercased (ASCII only) with punctuation as spaces, see
+    # app.search.query.normalize_key_sql; accents are left in and folded
+    # by the FTS5 tokenizer
+    search_key = Column(String, nullable=True)
     updated_search_at = Column(DateTime, nullable=True)
 
     # Relationships
@@ -126,8 +140,16 @@ class Unit(Base):
         "OLXDraftAdvert", back_populates="unit", cascade="all, delete-orphan")
 
     # Unique constraint for year_month + sku_id combination
+    # Listing filters followed by their keyset sort, so each page is a
+    # single range scan
     __table_args__ = (
         UniqueConstraint('year_month', 'sku_id', name='unique_unit_sku'),
+        Index('ix_units_product_status', 'product_id', 'status'),
+        Index('ix_units_status_id', 'status', 'id'),
+        Index('ix_units_status_price', 'status', 'selling_price', 'id'),
+        Index('ix_units_year_month_id', 'year_month', 'id'),
+        Index('ix_units_year_month_price',
+              'year_month', 'selling_price', 'id'),
     )
 
     def get_middle_photo_path(self):
@@ -155,12 +177,24 @@ class ProductCompatibility(Base):
     )
 
 
+class SkuSequence(Base):
+    """Last sku_id handed out per component_ref (products) and per
+    year_month (units), see app.core.sequences"""
+    __tablename__ = "sku_sequences"
+
+    scope = Column(String(10), primary_key=True)  # product|unit
+    key = Column(String(10), primary_key=True)  # component_ref|year_month
+    last_id = Column(Integer, nullable=False)
+
+
 class ProductPhoto(Base):
     __tablename__ = "product_photos"
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     filename = Column(String(255), nullable=False, unique=True)
+    # sha256 of the bytes, names the shared file in app.core.blobs
+    blob_hash = Column(String(64), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # Relationships
@@ -173,6 +207,8 @@ class UnitPhoto(Base):
     id = Column(Integer, primary_key=True, index=True)
     unit_id = Column(Integer, ForeignKey("units.id"), nullable=False)
     filename = Column(String(255), nullable=False, unique=True)
+    # sha256 of the bytes, names the shared file in app.core.blobs
+    blob_hash = Column(String(64), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     # Relationships
@@ -3,10 +3,10 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Unit
 from app.model.olx import OLXDraftAdvert
-import shutil
 from pathlib import Path
 from app.config import settings
 from app.models import UnitPhoto
+from app.core.blobs import link_file
 
 router = APIRouter()
 
@@ -48,7 +48,7 @@ def create_draft(unit_id: int, db: Session = Depends(get_db)):
             src = Path(settings.UNIT_PHOTO_DIR) / \
                 unit.get_middle_photo_path() / photo.filename
             dst = Path(settings.TEMP_PHOTO_DIR) / photo.filename
-            shutil.copy2(src, dst)
+            link_file(src, dst)
 
         return {"id": draft.id, "unit_id": draft.unit_id, "error": draft.error}
 
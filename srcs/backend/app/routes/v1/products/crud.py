@@ -1,12 +1,17 @@
-from fastapi import Depends, HTTPException, APIRouter
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, APIRouter, Query
+from collections import Counter
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.database import get_db
-from app.models import Make, Model
+from app.models import Model
 from app.models import Category, SubCategory, Component
 from app.models import Product, ProductCompatibility, Unit
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, ValidationError, constr
 from typing import List, Optional
 from app.tools import Tools
+from app.core.export import ndjson_response
+from app.core.sequences import allocate_sku_ids
+from app.core.pagination import SORTS, SORT_PATTERN, parse_cursor, keyset_page
 
 
 class ProductCreateRequest(BaseModel):
@@ -30,6 +35,15 @@ class ProductResponse(BaseModel):
     compatible_models: List[int]
 
 
+class ProductBulkRequest(BaseModel):
+    # Rows are validated one by one in the handler, so one bad row is
+    # reported in its result instead of failing the batch with a 422
+    products: List[dict]
+
+
+# Max products per bulk request, to bound the transaction
+BULK_MAX_PRODUCTS = 5000
+
 router = APIRouter()
 
 
@@ -55,10 +69,8 @@ def create_product(product_data: ProductCreateRequest,
                                     Model ID {model_id} not found")
 
         # Generate next SKU id for this component
-        max_sku = db.query(Product).filter(Product.component_ref ==
-                                           product_data.component_ref).order_by(Product.sku_id.desc()).first()
-
-        next_sku_id = (max_sku.sku_id + 1) if max_sku else 1
+        next_sku_id = allocate_sku_ids(
+            db, "product", product_data.component_ref)
         sku = product_data.component_ref + str(next_sku_id)
 
         # create product
@@ -108,22 +120,191 @@ def create_product(product_data: ProductCreateRequest,
         )
 
 
-@router.get("/")
-def get_products(db: Session = Depends(get_db)):
+def _product_dict(p) -> dict:
+    return {
+        "id": p.id,
+        "sku": p.sku,
+        "title": p.title,
+        "title_ref": p.title_ref,
+        "description": p.description,
+        "reference_price": p.reference_price,
+        "component_ref": p.component_ref
+    }
+
+
+def _products_query(db: Session, component_ref: Optional[str] = None,
+                    min_price: Optional[int] = None,
+                    max_price: Optional[int] = None):
+    query = db.query(Product)
+    if component_ref:
+        query = query.filter(Product.component_ref == component_ref)
+    if min_price is not None:
+        query = query.filter(Product.reference_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.reference_price <= max_price)
+    return query
+
+
+_PRODUCT_SORT_COLUMNS = {"id": Product.id, "price": Product.reference_price}
+
+
+@router.post("/bulk")
+def create_products_bulk(bulk_data: ProductBulkRequest,
+                         db: Session = Depends(get_db)):
+    """Create a batch of products in one transaction.
+
+    Components, models and title_refs are validated with one IN query
+    each, SKUs are allocated per component in one pass, and products
+    and compatibilities go in as executemany inserts. Rows that fail
+    validation are reported and skipped, the others are created.
+    """
+    if len(bulk_data.products) > BULK_MAX_PRODUCTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BULK_MAX_PRODUCTS} products per request")
+
     try:
-        products = db.query(Product).all()
-        return [
-            {
-                "id": p.id,
-                "sku": p.sku,
-                "title": p.title,
-                "title_ref": p.title_ref,
-                "description": p.description,
-                "reference_price": p.reference_price,
-                "component_ref": p.component_ref
+        results = [None] * len(bulk_data.products)
+        parsed = {}
+        for index, row in enumerate(bulk_data.products):
+            try:
+                parsed[index] = ProductCreateRequest.model_validate(row)
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                results[index] = {"index": index, "ok": False,
+                                  "error": f"{field}: {error['msg']}"}
+        items = parsed.values()
+
+        refs = {i.component_ref for i in items}
+        known_refs = {
+            ref for (ref,) in db.query(Component.ref).filter(
+                Component.ref.in_(refs))
+        }
+        model_ids = {m for i in items for m in i.model_ids}
+        known_models = {
+            model_id for (model_id,) in db.query(Model.id).filter(
+                Model.id.in_(model_ids))
+        }
+        title_refs = {i.title_ref for i in items if i.title_ref}
+        taken_title_refs = {
+            ref for (ref,) in db.query(Product.title_ref).filter(
+                Product.title_ref.in_(title_refs))
+        }
+
+        valid = []
+        for index, item in parsed.items():
+            missing = [m for m in item.model_ids if m not in known_models]
+            if item.component_ref not in known_refs:
+                error = f"Component {item.component_ref} not found"
+            elif missing:
+                error = f"Model ID {missing[0]} not found"
+            elif item.title_ref and item.title_ref in taken_title_refs:
+                error = f"title_ref {item.title_ref} already exists"
+            else:
+                error = None
+                if item.title_ref:
+                    taken_title_refs.add(item.title_ref)
+                valid.append(index)
+            if error:
+                results[index] = {"index": index, "ok": False,
+                                  "error": error}
+
+        # One SKU id range per component
+        counts = Counter(parsed[index].component_ref for index in valid)
+        next_sku_ids = {
+            ref: allocate_sku_ids(db, "product", ref, count)
+            for ref, count in counts.items()
+        }
+        rows = []
+        for index in valid:
+            item = parsed[index]
+            sku_id = next_sku_ids[item.component_ref]
+            next_sku_ids[item.component_ref] = sku_id + 1
+            rows.append({
+                "component_ref": item.component_ref,
+                "sku_id": sku_id,
+                "sku": item.component_ref + str(sku_id),
+                "title": item.title,
+                "title_ref": item.title_ref,
+                "description": item.description,
+                "reference_price": item.reference_price
+            })
+
+        if rows:
+            # RETURNING rows are matched back by SKU, asking SQLAlchemy
+            # for parameter order would insert one row at a time
+            ids_by_sku = {
+                sku: product_id for product_id, sku in db.execute(
+                    insert(Product).returning(Product.id, Product.sku),
+                    rows)
             }
-            for p in products
-        ]
+
+            compatibilities = []
+            for index, row in zip(valid, rows):
+                sku = row["sku"]
+                product_id = ids_by_sku[sku]
+                item_models = list(dict.fromkeys(parsed[index].model_ids))
+                compatibilities += [
+                    {"product_id": product_id, "model_id": m}
+                    for m in item_models
+                ]
+                results[index] = {"index": index, "ok": True,
+                                  "id": product_id, "sku": sku}
+            if compatibilities:
+                db.execute(insert(ProductCompatibility), compatibilities)
+
+        db.commit()
+
+        return {
+            "created": len(rows),
+            "failed": len(results) - len(rows),
+            "results": results
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create products: {str(e)}"
+        )
+
+
+@router.get("/")
+def get_products(component_ref: Optional[str] = None,
+                 min_price: Optional[int] = None,
+                 max_price: Optional[int] = None,
+                 sort: str = Query("newest", pattern=SORT_PATTERN),
+                 cursor: Optional[str] = None,
+                 limit: int = Query(50, ge=1, le=200),
+                 format: str = Query("json", pattern="^(json|ndjson)$"),
+                 db: Session = Depends(get_db)):
+    """Products, a page at a time (prices in cents). format=ndjson
+    streams every matching product instead, one per line, for bulk
+    exports"""
+    after = parse_cursor(cursor)
+    try:
+        def build_query(session):
+            return _products_query(
+                session, component_ref, min_price, max_price)
+
+        if format == "ndjson":
+            return ndjson_response(
+                lambda session: build_query(session).order_by(Product.id),
+                _product_dict)
+
+        field, descending = SORTS[sort]
+        products, next_cursor = keyset_page(
+            build_query(db), _PRODUCT_SORT_COLUMNS[field], Product.id,
+            descending, after, limit,
+            lambda p: (getattr(p, _PRODUCT_SORT_COLUMNS[field].key), p.id))
+
+        return {
+            "results": [_product_dict(p) for p in products],
+            "next_cursor": next_cursor
+        }
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Failed to fetch products: {str(e)}")
@@ -132,25 +313,27 @@ def get_products(db: Session = Depends(get_db)):
 @router.get("/{product_id}")
 def get_product(product_id: int, db: Session = Depends(get_db)):
     try:
-        product = db.query(Product).filter(Product.id == product_id).first()
+        # Two queries whatever the number of compatibilities: the
+        # product with its component, then compatibilities with their
+        # model and make
+        product = db.query(Product).options(
+            joinedload(Product.component),
+            selectinload(Product.compatibilities)
+            .joinedload(ProductCompatibility.model)
+            .joinedload(Model.make)
+        ).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        component = db.query(Component).filter(
-            Component.ref == product.component_ref).first()
-
-        compabilities = db.query(ProductCompatibility).filter(
-            ProductCompatibility.product_id == product_id
-        ).all()
+        component = product.component
 
         compatible_models = []
-        for comp in compabilities:
-            model = db.query(Model).filter(Model.id == comp.model_id).first()
-            make = db.query(Make).filter(Make.id == model.make_id).first()
+        for comp in product.compatibilities:
+            model = comp.model
             compatible_models.append({
                 "model_id": model.id,
                 "model_name": model.name,
-                "make_name": make.name,
+                "make_name": model.make.name,
                 "years": f"{model.start_year}-{model.end_year}"
             })
 
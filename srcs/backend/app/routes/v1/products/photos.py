@@ -1,23 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi import (
+    APIRouter, Depends, HTTPException, File, UploadFile, Query, Request)
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Product, ProductPhoto
 from app.config import settings
+from app.core.blobs import store_upload, publish
+from app.core.derivatives import photo_variant
+from app.core.file_responses import (
+    accel_file_response, resolve_under, IMMUTABLE, REVALIDATE)
+from starlette.concurrency import run_in_threadpool
 import datetime
 from pathlib import Path
-from fastapi.responses import FileResponse
 
 router = APIRouter()
 
 
 @router.get("/photos/{filename:path}")
-async def serve_product_photo(filename: str):
-    """Serve product photo files"""
+async def serve_product_photo(
+    filename: str,
+    request: Request,
+    size: str = Query("original", pattern="^(original|thumb|medium)$")
+):
+    """Serve product photo files, or a resized derivative with ?size=
+    (WebP for clients that accept it)"""
     try:
-        photo_path = Path(settings.PRODUCT_PHOTO_DIR) / filename
-        if not photo_path.exists():
+        # Checked before touching the disk: no "../" out of the photos
+        photo_path = resolve_under(Path(settings.PRODUCT_PHOTO_DIR), filename)
+        if photo_path is None or not photo_path.is_file():
             raise HTTPException(status_code=404, detail="Photo not found")
-        return FileResponse(photo_path)
+        variant = photo_variant(
+            photo_path, size, request.headers.get("accept"))
+        # A size served from the original until its derivative exists
+        # must not be cached for good
+        fallback = size != "original" and variant == photo_path
+        return accel_file_response(
+            request, variant, Path(settings.PHOTO_STORAGE_DIR),
+            cache_control=REVALIDATE if fallback else IMMUTABLE,
+            headers={"Vary": "Accept"})
     except Exception as e:
         raise HTTPException(status_code=404, detail="Photo not found")
 
@@ -60,15 +79,22 @@ async def upload_product_photo(
             product.component_ref / product.sku
         photo_dir.mkdir(parents=True, exist_ok=True)
 
-        # Save file
+        # Stream into the blob store (deduplicated, thumbnail and
+        # medium sizes made on first sight), then link it and its
+        # derivatives under the photo's name
         file_path = photo_dir / filename
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        try:
+            digest, blob = await store_upload(
+                file, settings.MAX_PHOTO_BYTES)
+        except ValueError:
+            raise HTTPException(
+                status_code=400, detail="File must be a valid image")
+        await run_in_threadpool(publish, blob, file_path)
         # Save to database
         photo_record = ProductPhoto(
             product_id=product_id,
-            filename=filename
+            filename=filename,
+            blob_hash=digest
         )
         db.add(photo_record)
         db.commit()
@@ -1,8 +1,14 @@
 from fastapi import APIRouter
-from .search import router as search_router
+from .search import router as search_router, search_all
 from .rebuild import router as rebuild_router
+from .fitment import router as fitment_router
+from .suggest import router as suggest_router
 
 router = APIRouter()
 
+router.add_api_route("", search_all, methods=["GET"])
+
 router.include_router(search_router)
 router.include_router(rebuild_router)
+router.include_router(fitment_router)
+router.include_router(suggest_router)
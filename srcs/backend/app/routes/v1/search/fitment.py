@@ -0,0 +1,122 @@
+from fastapi import Depends, HTTPException, APIRouter, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Optional
+from app.database import get_db
+from app.search.fitment import fitment_index
+from app.search.query import encode_cursor, decode_cursor
+
+router = APIRouter()
+
+
+def _years(model: dict) -> str | None:
+    """"2003-2009", "2003-" while still produced, None when unknown"""
+    if model["start_year"] is None:
+        return None
+    return f"{model['start_year']}-{model['end_year'] or ''}"
+
+
+@router.get("/fitment")
+def search_fitment(make: Optional[str] = None,
+                   model: Optional[str] = None,
+                   year: Optional[int] = None,
+                   component_ref: Optional[str] = None,
+                   category_id: Optional[int] = None,
+                   cursor: Optional[str] = None,
+                   limit: int = Query(50, ge=1, le=200),
+                   db: Session = Depends(get_db)):
+    """Active units fitting a vehicle (make, model name prefix, year)"""
+    if not (make or model or year):
+        raise HTTPException(
+            status_code=400, detail="Provide make, model and/or year")
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 1)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        models, product_ids = fitment_index.match(
+            db.connection(), make=make, model=model, year=year)
+
+        where = """
+            FROM units JOIN products ON products.id = units.product_id
+            WHERE units.product_id IN (SELECT value FROM json_each(:product_ids))
+        """
+        params = {"product_ids": "[" + ",".join(map(str, product_ids)) + "]"}
+        if component_ref:
+            where += " AND products.component_ref = :component_ref"
+            params["component_ref"] = component_ref
+        if category_id:
+            where += """
+            AND products.component_ref IN (
+                SELECT c.ref FROM components c
+                JOIN sub_categories sc ON sc.id = c.sub_category_id
+                WHERE sc.category_id = :category_id)
+            """
+            params["category_id"] = category_id
+
+        # Counted from the matched products' units, via the
+        # (product_id, status) index: the unary + keeps SQLite from
+        # scanning every active unit through a status index instead
+        counts = {
+            ref: n for ref, n in db.execute(text(
+                "SELECT products.component_ref, count(*) " + where +
+                " AND +units.status = 'active'"
+                " GROUP BY products.component_ref"
+            ), params)
+        }
+
+        # The page walks active units newest first, stopping after
+        # `limit` matches
+        page_where = where + " AND units.status = 'active'"
+        page_params = dict(params, limit=limit + 1)
+        if after:
+            page_where += " AND units.id < :after_id"
+            page_params["after_id"] = after[0]
+        rows = db.execute(text(
+            "SELECT units.id, units.sku, units.selling_price, units.status, "
+            "units.title_suffix, products.id, products.sku, products.title, "
+            "products.description, products.component_ref " + page_where +
+            " ORDER BY units.id DESC LIMIT :limit"
+        ), page_params).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][0])
+
+        return {
+            "models": [
+                {
+                    "model_id": m["model_id"],
+                    "model_name": m["model_name"],
+                    "make_name": m["make_name"],
+                    "years": _years(m)
+                }
+                for m in models
+            ],
+            "total": sum(counts.values()),
+            "counts": counts,
+            "results": [
+                {
+                    "id": r[0],
+                    "sku": r[1],
+                    "product_id": r[5],
+                    "product_sku": r[6],
+                    "full_reference": f"{r[6]}-{r[1]}",
+                    "product_title": r[7],
+                    "description": r[8],
+                    "component_ref": r[9],
+                    "selling_price": r[2],
+                    "status": r[3],
+                    "title_suffix": r[4]
+                }
+                for r in rows
+            ],
+            "next_cursor": next_cursor
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Fitment search failed: {str(e)}")
@@ -1,42 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.database import get_db
+from typing import Optional
+from app.database import get_db, engine
+from app.search.rebuild import start_rebuild, run_rebuild, rebuild_status
 
 router = APIRouter()
 
 
-@router.post("/rebuild-index")
-def rebuild_search_index(db: Session = Depends(get_db)):
+@router.post("/rebuild-index", status_code=202)
+def rebuild_search_index(background_tasks: BackgroundTasks,
+                         db: Session = Depends(get_db)):
+    """Repair stale search documents, as a background job.
+
+    search_text is maintained by triggers on every write, so this only
+    catches rows written behind their back (e.g. raw SQL imports).
+    Rows are processed in committed id-range chunks; calling this again
+    after a crash resumes the interrupted job where it stopped.
+    """
     try:
-        # Update products search_text
-        products_sql = """
-        UPDATE products 
-        SET search_text = title || ' ' || COALESCE(title_ref, '') || ' ' || sku,
-            updated_search_at = updated_at
-        WHERE updated_at != updated_search_at OR updated_search_at IS NULL
-        """
-        result1 = db.execute(text(products_sql))
-        db.commit()
-
-        # Update units search_text
-        units_sql = """
-        UPDATE units 
-        SET search_text = (
-            SELECT p.title || ' ' || COALESCE(p.title_ref, '') || ' ' || 
-                   COALESCE(units.title_suffix, '') || ' ' || 
-                   p.sku || ' ' || units.sku
-            FROM products p WHERE p.id = units.product_id
-        ),
-        updated_search_at = updated_at
-        WHERE updated_at != updated_search_at OR updated_search_at IS NULL
-        """
-        result2 = db.execute(text(units_sql))
-        db.commit()
-
-        return {"message": "Search index updated successfully"}
+        job_id, claimed = start_rebuild(engine)
+        if claimed:
+            background_tasks.add_task(run_rebuild, engine, job_id)
+
+        return {
+            "message": ("Search index rebuild started" if claimed
+                        else "Search index rebuild already running"),
+            "job": rebuild_status(db.connection(), job_id)
+        }
 
     except Exception as e:
-        db.rollback()
         raise HTTPException(
             status_code=500, detail=f"Failed to rebuild index: {str(e)}")
+
+
+@router.get("/rebuild-index/status")
+def search_rebuild_status(job_id: Optional[int] = None,
+                          db: Session = Depends(get_db)):
+    """Progress and rows/sec of a rebuild job, the latest by default"""
+    status = rebuild_status(db.connection(), job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Rebuild job not found")
+    return status
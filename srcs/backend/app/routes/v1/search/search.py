@@ -1,112 +1,245 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import text, literal_column
+from typing import Optional
 from app.database import get_db
 from app.models import Product, Unit
+from app.search.query import (
+    split_terms, SearchQuery, encode_cursor, decode_cursor)
+from app.search.fuzzy import fuzzy_index
+from app.search.facets import unit_facets
+from app.search.unified import grouped_search_sql, group_rows
+from app.search.cache import search_cache
 
 router = APIRouter()
 
 
+def _parse_cursor(cursor: Optional[str]) -> Optional[list]:
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor, 2)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _cache_key(endpoint: str, terms: list[str], *params) -> tuple:
+    """Normalized cache key: spacing and case don't change the results"""
+    return (endpoint, " ".join(terms).lower()) + params
+
+
+def _next_page(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    """Trim the extra lookahead row, and build the cursor if it existed"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last, score = rows[-1]
+    return rows, encode_cursor(score, last.id)
+
+
+def _ranked_search(db: Session, model, table: str, terms: list[str],
+                   limit: int, after: Optional[list]):
+    """One page of ranked hits (plus a lookahead row).
+
+    When nothing matches, retries with misspellings corrected and
+    returns the corrected terms alongside, else None.
+    """
+    search = SearchQuery(table, terms)
+    sql, params = search.page_sql(limit + 1, after)
+    rows = db.query(model, literal_column("score")).from_statement(
+        text(sql)).params(**params).all()
+    if rows:
+        return rows, search, None
+
+    # Pages of a corrected query come back with the original q, so
+    # retry here on every empty page, not only the first
+    corrected = fuzzy_index.suggest(db.connection(), terms)
+    if not corrected:
+        return rows, search, None
+    search = SearchQuery(table, corrected)
+    sql, params = search.page_sql(limit + 1, after)
+    rows = db.query(model, literal_column("score")).from_statement(
+        text(sql)).params(**params).all()
+    return rows, search, corrected if rows else None
+
+
+# Served at the bare /api/v1/search path, mounted by the package router
+# (an included router can't register an empty path itself)
+def search_all(q: str = "",
+               cursor: Optional[str] = None,
+               limit: int = Query(20, ge=1, le=100),
+               units_per_product: int = Query(5, ge=0, le=50),
+               db: Session = Depends(get_db)):
+    """Products and units in one round trip and one statement, with
+    matching units grouped under their product. Each group has the
+    total of its matching units (unit_count) and units_only set when
+    the product matched only through them"""
+    after = _parse_cursor(cursor)
+    try:
+        terms = split_terms(q)
+        key = _cache_key("all", terms, cursor, limit, units_per_product)
+        generation, cached = search_cache.get(db.connection(), key)
+        if cached is not None:
+            return cached
+
+        sql, params = grouped_search_sql(
+            terms, limit + 1, after, units_per_product)
+        rows = db.execute(text(sql), params).all()
+
+        corrected = None
+        if not rows and terms:
+            corrected = fuzzy_index.suggest(db.connection(), terms)
+            if corrected:
+                sql, params = grouped_search_sql(
+                    corrected, limit + 1, after, units_per_product)
+                rows = db.execute(text(sql), params).all()
+                if not rows:
+                    corrected = None
+
+        groups = group_rows(rows)
+        next_cursor = None
+        if len(groups) > limit:
+            groups = groups[:limit]
+            last = groups[-1]["product"]
+            next_cursor = encode_cursor(last["score"], last["id"])
+
+        return search_cache.put(key, generation, {
+            "results": groups,
+            "next_cursor": next_cursor,
+            "did_you_mean": " ".join(corrected) if corrected else None
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
 @router.get("/products")
-def search_products(q: str, db: Session = Depends(get_db)):
+def search_products(q: str,
+                    cursor: Optional[str] = None,
+                    limit: int = Query(50, ge=1, le=200),
+                    with_total: bool = False,
+                    db: Session = Depends(get_db)):
+    after = _parse_cursor(cursor)
     try:
-        if not q or len(q.strip()) == 0:
-            products = db.query(Product).order_by(
-                Product.created_at.desc()).limit(50).all()
+        terms = split_terms(q)
+        key = _cache_key("products", terms, cursor, limit, with_total)
+        generation, cached = search_cache.get(db.connection(), key)
+        if cached is not None:
+            return cached
+
+        total = None
+        corrected = None
+        if not terms:
+            # Newest first, walking the primary key
+            query = db.query(Product)
+            if after:
+                query = query.filter(Product.id < after[1])
+            products = query.order_by(
+                Product.id.desc()).limit(limit + 1).all()
+            rows = [(p, None) for p in products]
+            if with_total:
+                total = db.query(Product).count()
         else:
-            # Split search terms
-            terms = q.strip().split()
-
-            if len(terms) == 1:
-                # Single term search
-                products = db.query(Product).filter(
-                    Product.search_text.like(f"%{terms[0]}%")
-                ).limit(50).all()
-            else:
-                # Multi-term search with position checking
-                query = db.query(Product)
-                for term in terms:
-                    query = query.filter(Product.search_text.like(f"%{term}%"))
-
-                # Get candidates and filter for position in Python
-                products = query.limit(100).all()
-
-                # Filter for correct position order
-                filtered_products = []
-                for product in products:
-                    if product.search_text:
-                        search_lower = product.search_text.lower()
-                        positions = [search_lower.find(
-                            term.lower()) for term in terms]
-                        if all(pos >= 0 for pos in positions) and positions == sorted(positions):
-                            filtered_products.append(product)
-
-                products = filtered_products[:50]
-
-        return [
-            {
-                "id": p.id,
-                "sku": p.sku,
-                "title": p.title,
-                "title_ref": p.title_ref,
-                "description": p.description,
-                "reference_price": p.reference_price,
-                "component_ref": p.component_ref
-            }
-            for p in products
-        ]
+            # Ranking and top-N happen in SQLite, no post-filtering here
+            rows, search, corrected = _ranked_search(
+                db, Product, "products", terms, limit, after)
+            if with_total:
+                total = db.execute(
+                    text(search.count_sql()), search.params).scalar()
+
+        rows, next_cursor = _next_page(rows, limit)
+
+        return search_cache.put(key, generation, {
+            "results": [
+                {
+                    "id": p.id,
+                    "sku": p.sku,
+                    "title": p.title,
+                    "title_ref": p.title_ref,
+                    "description": p.description,
+                    "reference_price": p.reference_price,
+                    "component_ref": p.component_ref,
+                    "score": score
+                }
+                for p, score in rows
+            ],
+            "next_cursor": next_cursor,
+            "total": total,
+            "did_you_mean": " ".join(corrected) if corrected else None
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 
 @router.get("/units")
-def search_units(q: str, db: Session = Depends(get_db)):
+def search_units(q: str,
+                 cursor: Optional[str] = None,
+                 limit: int = Query(50, ge=1, le=200),
+                 with_total: bool = False,
+                 facets: bool = False,
+                 db: Session = Depends(get_db)):
+    after = _parse_cursor(cursor)
     try:
-        if not q or len(q.strip()) == 0:
-            units = db.query(Unit).join(Product).order_by(
-                Unit.created_at.desc()).limit(50).all()
+        terms = split_terms(q)
+        key = _cache_key("units", terms, cursor, limit, with_total, facets)
+        generation, cached = search_cache.get(db.connection(), key)
+        if cached is not None:
+            return cached
+
+        total = None
+        corrected = None
+        search = None
+        if not terms:
+            # Newest first, walking the primary key
+            query = db.query(Unit)
+            if after:
+                query = query.filter(Unit.id < after[1])
+            units = query.order_by(Unit.id.desc()).limit(limit + 1).all()
+            rows = [(i, None) for i in units]
+            if with_total:
+                total = db.query(Unit).count()
         else:
-            # Split search terms
-            terms = q.strip().split()
-
-            if len(terms) == 1:
-                # Single term search
-                units = db.query(Unit).filter(
-                    Unit.search_text.like(f"%{terms[0]}%")
-                ).limit(50).all()
+            # Ranking and top-N happen in SQLite, no post-filtering here
+            rows, search, corrected = _ranked_search(
+                db, Unit, "units", terms, limit, after)
+            if with_total:
+                total = db.execute(
+                    text(search.count_sql()), search.params).scalar()
+
+        rows, next_cursor = _next_page(rows, limit)
+
+        facet_counts = None
+        if facets:
+            if search:
+                facet_counts = unit_facets(
+                    db.connection(), search.where, search.params)
             else:
-                # Multi-term search with position checking
-                query = db.query(Unit)
-                for term in terms:
-                    query = query.filter(Unit.search_text.like(f"%{term}%"))
-
-                # Get candidates and filter for position in Python
-                units = query.limit(100).all()
-
-                # Filter for correct position order
-                filtered_units = []
-                for unit in units:
-                    if unit.search_text:
-                        search_lower = unit.search_text.lower()
-                        positions = [search_lower.find(
-                            term.lower()) for term in terms]
-                        if all(pos >= 0 for pos in positions) and positions == sorted(positions):
-                            filtered_units.append(unit)
-
-                units = filtered_units[:50]
-
-        return [
-            {
-                "id": i.id,
-                "sku": i.sku,
-                "product_sku": i.product.sku,
-                "full_reference": f"{i.product.sku} {i.sku}",
-                "selling_price": i.selling_price,
-                "status": i.status,
-                "description": i.product.description,
-                "title_suffix": i.title_suffix
-            }
-            for i in units
-        ]
+                facet_counts = unit_facets(db.connection(), "1", {})
+
+        return search_cache.put(key, generation, {
+            "results": [
+                {
+                    "id": i.id,
+                    "sku": i.sku,
+                    "product_sku": i.product.sku,
+                    "full_reference": f"{i.product.sku} {i.sku}",
+                    "selling_price": i.selling_price,
+                    "status": i.status,
+                    "description": i.product.description,
+                    "title_suffix": i.title_suffix,
+                    "score": score
+                }
+                for i, score in rows
+            ],
+            "next_cursor": next_cursor,
+            "total": total,
+            "did_you_mean": " ".join(corrected) if corrected else None,
+            "facets": facet_counts
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/cache-stats")
+def search_cache_stats():
+    """Hit/miss counters of this worker's search result cache"""
+    return search_cache.stats()
@@ -0,0 +1,16 @@
+from fastapi import HTTPException, APIRouter, Query
+from app.search.suggest import suggest_index
+
+router = APIRouter()
+
+
+@router.get("/suggest")
+def search_suggest(q: str,
+                   limit: int = Query(10, ge=1, le=20)):
+    """Typeahead: SKUs, title_refs, components, makes and models
+    starting with q, served from memory"""
+    try:
+        return suggest_index.suggest(q, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Suggest failed: {str(e)}")
@@ -1,10 +1,14 @@
-from fastapi import Depends, HTTPException, APIRouter
+from fastapi import Depends, HTTPException, APIRouter, Query
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import Product, Unit
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from app.tools import Tools
+from app.core.export import ndjson_response
+from app.core.sequences import allocate_sku_ids
+from app.core.pagination import SORTS, SORT_PATTERN, parse_cursor, keyset_page
 from app.dependencies.olx import get_olx_service
 from app.integrations.olx.service import OLXAdvertService
 
@@ -35,6 +39,13 @@ class UnitResponse(BaseModel):
     title_suffix: Optional[str] = None
 
 
+class UnitBulkRequest(BaseModel):
+    units: List[UnitCreateRequest]
+
+
+# Max units per intake request (a dismantled car is 30-80)
+BULK_MAX_UNITS = 500
+
 router = APIRouter()
 
 
@@ -72,11 +83,7 @@ def create_unit(unit_data: UnitCreateRequest,
                                 detail=f"Status must be one of:{valid_statuses}")
 
         # generate next SKU ID for this year_month
-        max_sku = db.query(Unit).filter(
-            Unit.year_month == unit_data.year_month
-        ).order_by(Unit.sku_id.desc()).first()
-
-        next_sku_id = (max_sku.sku_id + 1) if max_sku else 1
+        next_sku_id = allocate_sku_ids(db, "unit", unit_data.year_month)
         sku = unit_data.year_month + str(next_sku_id)
 
         new_unit = Unit(
@@ -120,25 +127,168 @@ def create_unit(unit_data: UnitCreateRequest,
         )
 
 
-@router.get("/")
-def get_units(db: Session = Depends(get_db)):
+def _unit_dict(row) -> dict:
+    i, product_sku, description = row
+    # TODO: need to better document full_reference
+    return {
+        "id": i.id,
+        "sku": i.sku,
+        "product_sku": product_sku,
+        # Business display format
+        "full_reference": f"{product_sku}-{i.sku}",
+        "selling_price": i.selling_price,
+        "status": i.status,
+        "description": description,
+        "title_suffix": i.title_suffix
+    }
+
+
+def _units_query(db: Session, status: Optional[str] = None,
+                 component_ref: Optional[str] = None,
+                 year_month: Optional[str] = None,
+                 min_price: Optional[int] = None,
+                 max_price: Optional[int] = None):
+    # Product columns come with the join, no lazy load per unit
+    query = db.query(Unit, Product.sku, Product.description).join(Product)
+    if status:
+        query = query.filter(Unit.status == status)
+    if component_ref:
+        query = query.filter(Product.component_ref == component_ref)
+    if year_month:
+        query = query.filter(Unit.year_month == year_month)
+    if min_price is not None:
+        query = query.filter(Unit.selling_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Unit.selling_price <= max_price)
+    return query
+
+
+_UNIT_SORT_COLUMNS = {"id": Unit.id, "price": Unit.selling_price}
+
+
+@router.post("/bulk")
+def create_units_bulk(bulk_data: UnitBulkRequest,
+                      db: Session = Depends(get_db)):
+    """Register a batch of units atomically: all of them or none.
+
+    Products are loaded with one IN query, a contiguous sku_id range
+    of the current year_month is reserved with one statement and all
+    units go in with one executemany. The insert triggers compute their
+    search documents in the same transaction.
+    """
+    items = bulk_data.units
+    if not items:
+        raise HTTPException(status_code=400, detail="No units given")
+    if len(items) > BULK_MAX_UNITS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BULK_MAX_UNITS} units per request")
+
     try:
-        units = db.query(Unit).join(Product).all()
-        # TODO: need to better document full_reference
-        return [
+        product_ids = {i.product_id for i in items}
+        products = {
+            p.id: p for p in db.query(Product).filter(
+                Product.id.in_(product_ids))
+        }
+
+        # TODO: need to put that possible states on .env in future
+        valid_statuses = ["active", "sold", "incomplete", "consume"]
+        errors = []
+        for index, item in enumerate(items):
+            product = products.get(item.product_id)
+            if not product:
+                errors.append({"index": index, "error":
+                               f"Product ID {item.product_id} not found"})
+            elif item.status not in valid_statuses:
+                errors.append({"index": index, "error":
+                               f"Status must be one of:{valid_statuses}"})
+            elif item.title_suffix:
+                full_title = (f"{product.title} {product.title_ref} "
+                              f"{item.title_suffix}")
+                if len(full_title) < 16 or len(full_title) > 70:
+                    errors.append({"index": index, "error":
+                                   "Full title must be between 16 and 70 "
+                                   f"characters (got {len(full_title)})"})
+        if errors:
+            raise HTTPException(status_code=400, detail=errors)
+
+        year_month = Tools.get_cur_year_month()
+        first_sku_id = allocate_sku_ids(db, "unit", year_month, len(items))
+
+        rows = [
             {
-                "id": i.id,
-                "sku": i.sku,
-                "product_sku": i.product.sku,
-                # Business display format
-                "full_reference": f"{i.product.sku}-{i.sku}",
-                "selling_price": i.selling_price,
-                "status": i.status,
-                "description": i.product.description,
-                "title_suffix": i.title_suffix
+                "product_id": item.product_id,
+                "year_month": year_month,
+                "sku_id": first_sku_id + n,
+                "sku": year_month + str(first_sku_id + n),
+                "alternative_sku": item.alternative_sku or "",
+                "selling_price": item.selling_price,
+                "km": item.km or 0,
+                "observations": item.observations or "",
+                "status": item.status,
+                "title_suffix": item.title_suffix
             }
-            for i in units
+            for n, item in enumerate(items)
         ]
+        ids_by_sku = {
+            sku: unit_id for unit_id, sku in db.execute(
+                insert(Unit).returning(Unit.id, Unit.sku), rows)
+        }
+        db.commit()
+
+        return [
+            UnitResponse(
+                id=ids_by_sku[row["sku"]],
+                product_sku=products[row["product_id"]].sku,
+                **row
+            )
+            for row in rows
+        ]
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create units: {str(e)}"
+        )
+
+
+@router.get("/")
+def get_units(status: Optional[str] = None,
+              component_ref: Optional[str] = None,
+              year_month: Optional[str] = None,
+              min_price: Optional[int] = None,
+              max_price: Optional[int] = None,
+              sort: str = Query("newest", pattern=SORT_PATTERN),
+              cursor: Optional[str] = None,
+              limit: int = Query(50, ge=1, le=200),
+              format: str = Query("json", pattern="^(json|ndjson)$"),
+              db: Session = Depends(get_db)):
+    """Units, a page at a time (prices in cents). format=ndjson streams
+    every matching unit instead, one per line, for bulk exports"""
+    after = parse_cursor(cursor)
+    try:
+        def build_query(session):
+            return _units_query(session, status, component_ref,
+                                year_month, min_price, max_price)
+
+        if format == "ndjson":
+            return ndjson_response(
+                lambda session: build_query(session).order_by(Unit.id),
+                _unit_dict)
+
+        field, descending = SORTS[sort]
+        rows, next_cursor = keyset_page(
+            build_query(db), _UNIT_SORT_COLUMNS[field], Unit.id,
+            descending, after, limit,
+            lambda row: (getattr(row[0], _UNIT_SORT_COLUMNS[field].key),
+                         row[0].id))
+
+        return {
+            "results": [_unit_dict(row) for row in rows],
+            "next_cursor": next_cursor
+        }
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Failed to fetch units: {str(e)}")
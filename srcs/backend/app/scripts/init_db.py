@@ -4,11 +4,13 @@ from app.config import settings
 import pandas as pd
 from sqlalchemy.orm import sessionmaker
 from app.model import olx  # noqa: F401
+from app.search.index import ensure_search_index
 
 
 def create_tables():
     """create all database tables"""
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
     print("✅ Database tables created!")
 
 
@@ -0,0 +1,140 @@
+from app.database import SessionLocal
+from app.models import Product, ProductPhoto, Unit, UnitPhoto
+from app.model import olx  # noqa: F401 - Import to register OLX models
+from app.config import settings
+from app.core.blobs import (
+    BLOB_DIR, blob_path, discard, import_file, publish)
+from pathlib import Path
+import shutil
+import sys
+import time
+
+# Blobs no row references are kept this long before gc removes them,
+# covering uploads whose row isn't committed yet
+GC_GRACE_SECONDS = 60 * 60
+
+# Where OLX draft photos were staged before settings.TEMP_PHOTO_DIR
+# moved onto the photos volume
+OLD_TEMP_PHOTO_DIR = Path(settings.DATA_PATH) / "data/temp_photos"
+
+
+def photo_paths(session, stored: bool | None = None):
+    """(row, named file) of every photo, or only of those in the blob
+    store (stored=True) or not yet (stored=False)"""
+    def where(model):
+        if stored is None:
+            return True
+        return (model.blob_hash.isnot(None) if stored
+                else model.blob_hash.is_(None))
+
+    # Same directories as the upload endpoints
+    for photo, product in session.query(ProductPhoto, Product).join(
+            Product).filter(where(ProductPhoto)):
+        yield photo, (Path(settings.PRODUCT_PHOTO_DIR)
+                      / product.component_ref / product.sku / photo.filename)
+    for photo, product in session.query(UnitPhoto, Product).select_from(
+            UnitPhoto).join(Unit).join(Product).filter(where(UnitPhoto)):
+        yield photo, (Path(settings.UNIT_PHOTO_DIR)
+                      / product.component_ref / product.sku / photo.filename)
+
+
+def _store(path: Path) -> str:
+    """Move a named photo's bytes into the store and link it back"""
+    digest, blob = import_file(path)
+    publish(blob, path)
+    return digest
+
+
+def migrate_photos():
+    """Move photos saved before the blob store into it.
+
+    Identical files end up as links to one blob, their derivatives
+    too. Safe to run again, only rows without blob_hash are handled.
+    """
+    session = SessionLocal()
+    moved = missing = failed = 0
+    try:
+        for photo, path in list(photo_paths(session, stored=False)):
+            if not path.exists():
+                missing += 1
+                print(f"⚠️  File not found: {path}")
+                continue
+            try:
+                photo.blob_hash = _store(path)
+                moved += 1
+            except Exception as e:
+                failed += 1
+                print(f"❌ {path}: {e}")
+            if moved % 500 == 0:
+                session.commit()
+        session.commit()
+    finally:
+        session.close()
+
+    print(f"✅ {moved} photos moved to the blob store, "
+          f"{missing} missing, {failed} failed")
+
+
+def migrate_staging():
+    """Move OLX draft photos staged in the old temp directory to
+    settings.TEMP_PHOTO_DIR, where the temp server now serves them, so
+    drafts pending at deploy time keep their photo URLs"""
+    if not OLD_TEMP_PHOTO_DIR.is_dir():
+        return
+    staging = Path(settings.TEMP_PHOTO_DIR)
+    staging.mkdir(parents=True, exist_ok=True)
+    moved = kept = 0
+    for path in OLD_TEMP_PHOTO_DIR.iterdir():
+        if not path.is_file():
+            continue
+        target = staging / path.name
+        if target.exists():
+            kept += 1
+            print(f"⚠️  Already staged, left in place: {path}")
+            continue
+        # Renamed, or copied then removed across mounts
+        shutil.move(path, target)
+        moved += 1
+    if not any(OLD_TEMP_PHOTO_DIR.iterdir()):
+        OLD_TEMP_PHOTO_DIR.rmdir()
+
+    print(f"✅ {moved} staged OLX photos moved to {staging}, {kept} kept")
+
+
+def collect_garbage():
+    """Remove blobs no photo references any more"""
+    session = SessionLocal()
+    try:
+        referenced = {
+            digest for (digest,) in session.query(ProductPhoto.blob_hash)
+            .union(session.query(UnitPhoto.blob_hash)) if digest
+        }
+    finally:
+        session.close()
+
+    cutoff = time.time() - GC_GRACE_SECONDS
+    removed = 0
+    for path in BLOB_DIR.glob("??/*.jpg"):
+        digest = path.stem
+        if "." in digest or digest in referenced:
+            continue
+        stat = path.stat()
+        # ctime moves when a file is linked in, mtime may be older
+        if max(stat.st_mtime, stat.st_ctime) > cutoff:
+            continue
+        discard(blob_path(digest))
+        removed += 1
+    # Leftovers of interrupted uploads
+    for path in BLOB_DIR.glob("incoming/*"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+    print(f"✅ {removed} unreferenced blobs removed")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "gc":
+        collect_garbage()
+    else:
+        migrate_photos()
+        migrate_staging()
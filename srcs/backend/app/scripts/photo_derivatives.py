@@ -0,0 +1,83 @@
+from app.database import SessionLocal
+from app.core.blobs import blob_path, publish
+from app.core.derivatives import (
+    SIZES, FORMATS, derivative_path, make_derivatives)
+from app.scripts.photo_blobs import photo_paths
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import os
+import sys
+
+
+def _variants(path: Path) -> list[Path]:
+    return [derivative_path(path, size, fmt)
+            for size in SIZES for fmt in FORMATS]
+
+
+def _linked(blob: Path, path: Path) -> bool:
+    """Whether path and its derivatives are the blob's files"""
+    for stored, named in zip([blob] + _variants(blob),
+                             [path] + _variants(path)):
+        if stored.exists() and not (
+                named.exists() and os.path.samefile(stored, named)):
+            return False
+    return True
+
+
+def backfill_derivatives(force: bool = False):
+    """Generate thumbnail/medium derivatives missing from the blob
+    store, then link them to every photo using each blob.
+
+    Derivatives are made on the blobs, never next to the named files:
+    those are links into the store.
+    """
+    session = SessionLocal()
+    try:
+        paths = defaultdict(list)
+        unstored = 0
+        for photo, path in photo_paths(session):
+            if photo.blob_hash:
+                paths[photo.blob_hash].append(path)
+            else:
+                unstored += 1
+    finally:
+        session.close()
+
+    missing = [
+        digest for digest in paths
+        if blob_path(digest).exists() and (force or not all(
+            p.exists() for p in _variants(blob_path(digest))))
+    ]
+    print(f"Generating derivatives for {len(missing)} photos...")
+
+    failed = set()
+    with ProcessPoolExecutor() as pool:
+        futures = [(d, pool.submit(make_derivatives, str(blob_path(d))))
+                   for d in missing]
+        for digest, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed.add(digest)
+                print(f"❌ {blob_path(digest)}: {e}")
+
+    relinked = 0
+    for digest, named in paths.items():
+        if digest in failed:
+            continue
+        blob = blob_path(digest)
+        for path in named:
+            if not _linked(blob, path):
+                publish(blob, path)
+                relinked += 1
+
+    print(f"✅ {len(missing) - len(failed)} photos done, "
+          f"{len(failed)} failed, {relinked} photos relinked")
+    if unstored:
+        print(f"⚠️  {unstored} photos are not in the blob store yet, "
+              "run make photo-blobs first")
+
+
+if __name__ == "__main__":
+    backfill_derivatives(force=len(sys.argv) > 1 and sys.argv[1] == "force")
@@ -2,11 +2,11 @@ from app.database import engine
 from app.models import Product, Unit, ProductCompatibility, ProductPhoto
 from app.model import olx  # noqa: F401 - Import to register OLX models
 from app.config import settings
+from app.core.blobs import import_file, publish
 import pandas as pd
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
 import re
-import shutil
 import datetime
 
 
@@ -133,7 +133,6 @@ def load_example_data():
 
 def populate_product_photos(session, df_products):
     """Populate product photos from temp_photos directory"""
-    import shutil
     import time
     import datetime
 
@@ -203,19 +202,21 @@ def populate_product_photos(session, df_products):
                 ).first()
 
                 if not existing_photo:
-                    # Copy file from temp to products directory
+                    # Store file in the blob store, linked into the products directory
                     source_path = temp_photos_dir / variant_filename
                     dest_path = photo_dir / component_ref / sku / new_filename
                     dest_path.parent.mkdir(parents=True, exist_ok=True)
                     try:
-                        shutil.copy2(source_path, dest_path)
+                        digest, blob = import_file(source_path)
+                        publish(blob, dest_path)
                         print(f"  📁 Copied: {
                               variant_filename} → {new_filename}")
 
                         # Save to database with new filename
                         photo_record = ProductPhoto(
                             product_id=product.id,
-                            filename=new_filename
+                            filename=new_filename,
+                            blob_hash=digest
                         )
                         session.add(photo_record)
                         photos_created += 1
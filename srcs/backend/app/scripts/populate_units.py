@@ -2,10 +2,10 @@ from app.database import engine
 from app.models import Product, Unit, UnitPhoto
 from app.model import olx  # noqa: F401 - Import to register OLX models
 from app.config import settings
+from app.core.blobs import import_file, publish
 import pandas as pd
 from sqlalchemy.orm import sessionmaker
 from pathlib import Path
-import shutil
 import datetime
 
 
@@ -224,21 +224,23 @@ def populate_unit_photos(session, df_units):
                 ).first()
 
                 if not existing_photo:
-                    # Copy file from temp to units directory
+                    # Store file in the blob store, linked into the units directory
                     # Storage: UNIT_PHOTO_DIR/component_ref/product_sku/filename
                     source_path = temp_photos_dir / variant_filename
                     dest_path = photo_dir / product.component_ref / product.sku / new_filename
                     dest_path.parent.mkdir(parents=True, exist_ok=True)
 
                     try:
-                        shutil.copy2(source_path, dest_path)
+                        digest, blob = import_file(source_path)
+                        publish(blob, dest_path)
                         print(f"  📁 Copied: {
                               variant_filename} → {new_filename}")
 
                         # Save to database with new filename
                         photo_record = UnitPhoto(
                             unit_id=unit.id,
-                            filename=new_filename
+                            filename=new_filename,
+                            blob_hash=digest
                         )
                         session.add(photo_record)
                         photos_created += 1
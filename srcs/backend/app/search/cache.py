@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from app.search.changes import current_generation
+
+# Responses kept per worker process
+CACHE_SIZE = 512
+
+
+class SearchCache:
+    """LRU of search responses, valid for one write generation.
+
+    The generation is the search_changes sequence, bumped by triggers
+    on every product/unit/compatibility/catalog write, categories
+    included. It lives in the database, so a write through any worker
+    invalidates every worker's cache on its next lookup.
+    """
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, conn, key) -> tuple[int, dict | None]:
+        """(generation, cached response or None) for `key`.
+
+        Hand the generation back to put(), so a response computed
+        while a write landed is never stored as current.
+        """
+        generation = current_generation(conn)
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return generation, response
+
+    def put(self, key, generation: int, response: dict) -> dict:
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = response
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return response
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "entries": len(self._entries),
+                "size": self.size,
+                "generation": self._generation
+            }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,30 @@
+from sqlalchemy import text
+
+
+def current_generation(conn) -> int:
+    """Sequence number of the latest logged search-relevant write."""
+    seq = conn.execute(text(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'search_changes'"
+    )).scalar()
+    return seq or 0
+
+
+def changes_since(conn, generation: int) -> dict[str, set[int]] | None:
+    """Ids written per entity after `generation`.
+
+    Returns None when the log was pruned past `generation`, callers
+    must then reload from scratch.
+    """
+    oldest = conn.execute(text(
+        "SELECT min(seq) FROM search_changes")).scalar()
+    if oldest is not None and oldest > generation + 1:
+        return None
+
+    changes = {}
+    rows = conn.execute(text(
+        "SELECT DISTINCT entity, entity_id FROM search_changes "
+        "WHERE seq > :generation"
+    ), {"generation": generation})
+    for entity, entity_id in rows:
+        changes.setdefault(entity, set()).add(entity_id)
+    return changes
@@ -0,0 +1,55 @@
+from sqlalchemy import text
+
+# selling_price band edges, in cents
+PRICE_BANDS = [0, 2500, 5000, 10000, 25000, 50000, 100000]
+
+
+def _band_label(low: int, high: int | None) -> str:
+    if high is None:
+        return f"{low // 100}+"
+    return f"{low // 100}-{high // 100}"
+
+
+def _price_band_sql() -> str:
+    """CASE expression putting hits.selling_price into its band label"""
+    cases = []
+    for low, high in zip(PRICE_BANDS, PRICE_BANDS[1:]):
+        cases.append(
+            f"WHEN hits.selling_price < {high} "
+            f"THEN '{_band_label(low, high)}'")
+    last = _band_label(PRICE_BANDS[-1], None)
+    return "CASE " + " ".join(cases) + f" ELSE '{last}' END"
+
+
+def unit_facets(conn, where: str, params: dict) -> dict:
+    """Facet counts of the units matching `where`, in a single query.
+
+    The matches are materialized once and every facet is a GROUP BY
+    over that set, glued together with UNION ALL.
+    """
+    sql = f"""
+        WITH hits AS MATERIALIZED (
+            SELECT units.status, units.selling_price, products.component_ref
+            FROM units JOIN products ON products.id = units.product_id
+            WHERE {where}
+        )
+        SELECT 'component_ref', component_ref, count(*)
+        FROM hits GROUP BY component_ref
+        UNION ALL
+        SELECT 'category', categories.name, count(*)
+        FROM hits
+        JOIN components ON components.ref = hits.component_ref
+        JOIN sub_categories ON sub_categories.id = components.sub_category_id
+        JOIN categories ON categories.id = sub_categories.category_id
+        GROUP BY categories.name
+        UNION ALL
+        SELECT 'status', status, count(*)
+        FROM hits GROUP BY status
+        UNION ALL
+        SELECT 'price', {_price_band_sql()}, count(*)
+        FROM hits GROUP BY 2
+    """
+    facets = {"component_ref": {}, "category": {}, "status": {}, "price": {}}
+    for facet, value, count in conn.execute(text(sql), params):
+        facets[facet][value] = count
+    return facets
@@ -0,0 +1,115 @@
+import threading
+from sqlalchemy import text
+from app.search.changes import current_generation, changes_since
+from app.search.query import fold
+
+
+def _bits_to_ids(bits: int) -> list[int]:
+    """Positions of the set bits, ascending"""
+    reversed_bits = bin(bits)[:1:-1]
+    ids = []
+    i = reversed_bits.find("1")
+    while i != -1:
+        ids.append(i)
+        i = reversed_bits.find("1", i + 1)
+    return ids
+
+
+class FitmentIndex:
+    """Precomputed vehicle compatibility: one product bitset per model.
+
+    Bit N of a model's bitset is set when product N fits it, so
+    "which products fit these models" is an OR of a few ints instead
+    of joins over product_compatibility/models/makes per request.
+
+    Follows the search_changes log: compatibility writes reload only
+    the products involved, model/make writes reload the (small) model
+    catalogue.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._models: dict[int, dict] = {}
+        self._bits: dict[int, int] = {}
+
+    def _load_models(self, conn):
+        rows = conn.execute(text(
+            "SELECT m.id, m.name, m.start_year, m.end_year, mk.id, mk.name "
+            "FROM models m JOIN makes mk ON mk.id = m.make_id"
+        ))
+        self._models = {
+            r[0]: {
+                "model_id": r[0],
+                "model_name": r[1],
+                "start_year": r[2],
+                "end_year": r[3],
+                "make_id": r[4],
+                "make_name": r[5],
+                "model_key": fold(r[1] or ""),
+                "make_key": fold(r[5] or ""),
+            }
+            for r in rows
+        }
+
+    def _load_compatibility(self, conn, product_ids=None):
+        """(Re)load the bits of the given products, or all when None"""
+        sql = "SELECT product_id, model_id FROM product_compatibility"
+        params = {}
+        if product_ids is None:
+            self._bits = {}
+        else:
+            mask = 0
+            for pid in product_ids:
+                mask |= 1 << pid
+            for model_id in self._bits:
+                self._bits[model_id] &= ~mask
+            sql += " WHERE product_id IN (SELECT value FROM json_each(:ids))"
+            params = {"ids": "[" + ",".join(map(str, product_ids)) + "]"}
+        for product_id, model_id in conn.execute(text(sql), params):
+            self._bits[model_id] = self._bits.get(model_id, 0) | (
+                1 << product_id)
+
+    def refresh(self, conn):
+        """Catch up with writes logged since the last refresh"""
+        with self._lock:
+            generation = current_generation(conn)
+            if generation == self._generation:
+                return
+            changes = None
+            if self._generation is not None:
+                changes = changes_since(conn, self._generation)
+            if changes is None:
+                self._load_models(conn)
+                self._load_compatibility(conn)
+            else:
+                if "model" in changes or "make" in changes:
+                    self._load_models(conn)
+                if "compatibility" in changes:
+                    self._load_compatibility(conn, changes["compatibility"])
+            self._generation = generation
+
+    def match(self, conn, make: str | None = None, model: str | None = None,
+              year: int | None = None) -> tuple[list[dict], list[int]]:
+        """Models matching the filters, and the ids of products fitting
+        any of them. Make is matched by name, model by name prefix.
+        """
+        self.refresh(conn)
+        make_key = fold(make.strip()) if make else None
+        model_key = fold(model.strip()) if model else None
+        with self._lock:
+            models = [
+                m for m in self._models.values()
+                if (make_key is None or m["make_key"] == make_key)
+                and (model_key is None or m["model_key"].startswith(model_key))
+                and (year is None or (
+                    (m["start_year"] is None or m["start_year"] <= year)
+                    and (m["end_year"] is None or year <= m["end_year"])))
+            ]
+            bits = 0
+            for m in models:
+                bits |= self._bits.get(m["model_id"], 0)
+        return models, _bits_to_ids(bits)
+
+
+fitment_index = FitmentIndex()
@@ -0,0 +1,179 @@
+import bisect
+import re
+import threading
+from sqlalchemy import text
+from app.search.changes import current_generation, changes_since
+from app.search.query import fold
+
+MAX_EDIT_DISTANCE = 2
+# Shorter words are too ambiguous to correct
+MIN_WORD_LEN = 4
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _words(*texts) -> set[str]:
+    """Correctable words: alphabetic tokens, codes are left to trigrams"""
+    words = set()
+    for t in texts:
+        for w in _WORD_RE.findall(fold(t or "")):
+            if len(w) >= MIN_WORD_LEN and w.isalpha():
+                words.add(w)
+    return words
+
+
+def _deletes(word: str, distance: int) -> set[str]:
+    """Every string reachable from `word` by up to `distance` deletions"""
+    result = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:]
+                    for w in frontier for i in range(len(w))}
+        result |= frontier
+    return result
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment), capped at limit+1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (prev2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class FuzzyIndex:
+    """SymSpell-style spelling corrector over the search vocabulary.
+
+    Words come from product titles, title_refs and component names.
+    Every word is stored under all its deletion variants, so a lookup
+    only generates the deletions of the misspelled term and probes a
+    dict: bounded by the term length, not by the number of rows.
+
+    The dictionary follows the search_changes log, reloading only the
+    products/components written since the last lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._generation = None
+        self._sources: dict[tuple[str, int], set[str]] = {}
+        self._counts: dict[str, int] = {}
+        self._variants: dict[str, set[str]] = {}
+        self._sorted: list[str] | None = None
+
+    def _add(self, key: tuple[str, int], words: set[str]):
+        self._sources[key] = words
+        for w in words:
+            self._counts[w] = self._counts.get(w, 0) + 1
+            if self._counts[w] == 1:
+                self._sorted = None
+                for v in _deletes(w, MAX_EDIT_DISTANCE):
+                    self._variants.setdefault(v, set()).add(w)
+
+    def _remove(self, key: tuple[str, int]):
+        for w in self._sources.pop(key, ()):
+            self._counts[w] -= 1
+            if self._counts[w] == 0:
+                del self._counts[w]
+                self._sorted = None
+                for v in _deletes(w, MAX_EDIT_DISTANCE):
+                    words = self._variants.get(v)
+                    if words:
+                        words.discard(w)
+                        if not words:
+                            del self._variants[v]
+
+    def _load(self, conn, product_ids=None, component_ids=None):
+        """(Re)load the given rows, or everything when ids are None"""
+        full = product_ids is None and component_ids is None
+        if full:
+            self._clear()
+
+        sources = [
+            ("product", "SELECT id, title, title_ref FROM products",
+             product_ids),
+            ("component", "SELECT id, name FROM components", component_ids),
+        ]
+        for entity, sql, ids in sources:
+            if not full and not ids:
+                continue
+            params = {}
+            if ids:
+                sql += " WHERE id IN (" + ", ".join(
+                    f":id{n}" for n in range(len(ids))) + ")"
+                params = {f"id{n}": i for n, i in enumerate(ids)}
+                for i in ids:
+                    self._remove((entity, i))
+            for row in conn.execute(text(sql), params):
+                self._add((entity, row[0]), _words(*row[1:]))
+
+    def refresh(self, conn):
+        """Catch up with writes logged since the last refresh"""
+        with self._lock:
+            generation = current_generation(conn)
+            if generation == self._generation:
+                return
+            changes = None
+            if self._generation is not None:
+                changes = changes_since(conn, self._generation)
+            if changes is None:
+                self._load(conn)
+            else:
+                self._load(conn,
+                           product_ids=changes.get("product", set()),
+                           component_ids=changes.get("component", set()))
+            self._generation = generation
+
+    def _is_known_prefix(self, term: str) -> bool:
+        if self._sorted is None:
+            self._sorted = sorted(self._counts)
+        i = bisect.bisect_left(self._sorted, term)
+        return i < len(self._sorted) and self._sorted[i].startswith(term)
+
+    def correct(self, term: str) -> str | None:
+        """Closest vocabulary word to `term`, or None if the term is
+        already known (as a word prefix) or nothing is close enough.
+        Ties on distance go to the most frequent word.
+        """
+        term = fold(term)
+        if len(term) < MIN_WORD_LEN or not term.isalpha():
+            return None
+        with self._lock:
+            if self._is_known_prefix(term):
+                return None
+            candidates = set()
+            for v in _deletes(term, MAX_EDIT_DISTANCE):
+                candidates |= self._variants.get(v, set())
+            best = None
+            for word in candidates:
+                d = _edit_distance(term, word, MAX_EDIT_DISTANCE)
+                if d > MAX_EDIT_DISTANCE:
+                    continue
+                key = (d, -self._counts[word], word)
+                if best is None or key < best:
+                    best = key
+            return best[2] if best else None
+
+    def suggest(self, conn, terms: list[str]) -> list[str] | None:
+        """Terms with misspellings corrected, None if nothing changed"""
+        self.refresh(conn)
+        corrected = [self.correct(t) or t for t in terms]
+        return corrected if corrected != terms else None
+
+
+fuzzy_index = FuzzyIndex()
@@ -0,0 +1,507 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.search.query import normalize_key_sql
+
+# Bump whenever the DDL below changes: existing databases are migrated
+# by dropping and recreating every search object on startup.
+SEARCH_INDEX_VERSION = 11
+
+# "Make Model" names of every vehicle a product fits, stored on the
+# product as compat_text. Evaluated inside UPDATE products statements.
+COMPAT_TEXT = """(
+    SELECT group_concat(name, ' ') FROM (
+        SELECT makes.name || ' ' || models.name AS name
+        FROM product_compatibility
+        JOIN models ON models.id = product_compatibility.model_id
+        JOIN makes ON makes.id = models.make_id
+        WHERE product_compatibility.product_id = products.id
+        ORDER BY makes.name, models.name
+    )
+)"""
+
+# Search documents, as SQL expressions evaluated inside
+# UPDATE products / UPDATE units statements. Units read their product's
+# precomputed compat_text instead of joining the compatibility tables.
+PRODUCT_SEARCH_TEXT = (
+    "products.title || ' ' || COALESCE(products.title_ref, '') || ' ' || "
+    "products.sku || ' ' || COALESCE(products.compat_text, '')"
+)
+UNIT_SEARCH_TEXT = (
+    "(SELECT p.title || ' ' || COALESCE(p.title_ref, '') || ' ' || "
+    "COALESCE(units.title_suffix, '') || ' ' || p.sku || ' ' || units.sku "
+    "|| ' ' || COALESCE(units.alternative_sku, '') || ' ' || "
+    "COALESCE(p.compat_text, '') "
+    "FROM products p WHERE p.id = units.product_id)"
+)
+PRODUCT_SEARCH_KEY = normalize_key_sql(PRODUCT_SEARCH_TEXT)
+UNIT_SEARCH_KEY = normalize_key_sql(UNIT_SEARCH_TEXT)
+
+# B-tree indexes search and the listings rely on. Also declared on the
+# models, these statements add them to databases created before the
+# declaration. Cheap when present, so they run on every startup.
+_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_units_product_status "
+    "ON units (product_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_units_status_id ON units (status, id)",
+    "CREATE INDEX IF NOT EXISTS ix_units_status_price "
+    "ON units (status, selling_price, id)",
+    "CREATE INDEX IF NOT EXISTS ix_units_year_month_id "
+    "ON units (year_month, id)",
+    "CREATE INDEX IF NOT EXISTS ix_units_year_month_price "
+    "ON units (year_month, selling_price, id)",
+    "CREATE INDEX IF NOT EXISTS ix_products_component_id "
+    "ON products (component_ref, id)",
+    "CREATE INDEX IF NOT EXISTS ix_products_component_price "
+    "ON products (component_ref, reference_price, id)",
+    "CREATE INDEX IF NOT EXISTS ix_units_selling_price "
+    "ON units (selling_price)",
+    "CREATE INDEX IF NOT EXISTS ix_products_reference_price "
+    "ON products (reference_price)",
+    "CREATE INDEX IF NOT EXISTS ix_product_photos_blob_hash "
+    "ON product_photos (blob_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_unit_photos_blob_hash "
+    "ON unit_photos (blob_hash)",
+]
+
+# (table, column, type) added to databases created before the column
+_COLUMNS = [
+    ("products", "search_key", "VARCHAR"),
+    ("units", "search_key", "VARCHAR"),
+    ("products", "compat_text", "VARCHAR"),
+    ("product_photos", "blob_hash", "VARCHAR(64)"),
+    ("unit_photos", "blob_hash", "VARCHAR(64)"),
+]
+
+# External-content FTS5 tables: they only hold the inverted index and
+# read the document text back from products/units by rowid. They index
+# search_key, the folded search_text; together with the tokenizer it
+# gives the same tokens as normalize_key gives query terms.
+_TABLES = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        search_key,
+        content='products', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS units_fts USING fts5(
+        search_key,
+        content='units', content_rowid='id',
+        tokenize='unicode61', prefix='2 3'
+    )
+    """,
+    # Trigram tables answer infix lookups on codes (SKU fragments, OEM
+    # references) from index postings instead of LIKE '%..%' scans.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_trgm USING fts5(
+        sku, title_ref,
+        content='products', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS units_trgm USING fts5(
+        sku, alternative_sku,
+        content='units', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+]
+
+# Recompute search_text and its key on the write itself, so new rows
+# are searchable right away. A product change fans out only to that
+# product's units. Plain SQL only, so writes from any SQLite client
+# keep them current.
+_SEARCH_TEXT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_search_ai AFTER INSERT ON products
+    BEGIN
+        UPDATE products SET search_text = {PRODUCT_SEARCH_TEXT},
+            search_key = {PRODUCT_SEARCH_KEY},
+            updated_search_at = products.updated_at
+        WHERE products.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS products_search_au
+    AFTER UPDATE OF title, title_ref, sku, compat_text ON products
+    BEGIN
+        UPDATE products SET search_text = {PRODUCT_SEARCH_TEXT},
+            search_key = {PRODUCT_SEARCH_KEY},
+            updated_search_at = products.updated_at
+        WHERE products.id = new.id;
+        UPDATE units SET search_text = {UNIT_SEARCH_TEXT},
+            search_key = {UNIT_SEARCH_KEY},
+            updated_search_at = units.updated_at
+        WHERE units.product_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS units_search_ai AFTER INSERT ON units
+    BEGIN
+        UPDATE units SET search_text = {UNIT_SEARCH_TEXT},
+            search_key = {UNIT_SEARCH_KEY},
+            updated_search_at = units.updated_at
+        WHERE units.id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS units_search_au
+    AFTER UPDATE OF title_suffix, sku, alternative_sku, product_id ON units
+    BEGIN
+        UPDATE units SET search_text = {UNIT_SEARCH_TEXT},
+            search_key = {UNIT_SEARCH_KEY},
+            updated_search_at = units.updated_at
+        WHERE units.id = new.id;
+    END
+    """,
+]
+
+# Keep compat_text current as fitments are added or removed and as
+# vehicles get renamed. Each update re-fires products_search_au, which
+# carries it on to the product's and its units' search documents.
+_COMPAT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_compatibility_search_ai
+    AFTER INSERT ON product_compatibility
+    BEGIN
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE products.id = new.product_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_compatibility_search_ad
+    AFTER DELETE ON product_compatibility
+    BEGIN
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE products.id = old.product_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_compatibility_search_au
+    AFTER UPDATE OF product_id, model_id ON product_compatibility
+    BEGIN
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE products.id IN (old.product_id, new.product_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS models_search_au
+    AFTER UPDATE OF name, make_id ON models
+    BEGIN
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE products.id IN (
+            SELECT product_id FROM product_compatibility
+            WHERE model_id = new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS makes_search_au
+    AFTER UPDATE OF name ON makes
+    BEGIN
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE products.id IN (
+            SELECT product_compatibility.product_id
+            FROM product_compatibility
+            JOIN models ON models.id = product_compatibility.model_id
+            WHERE models.make_id = new.id);
+    END
+    """,
+]
+
+# Keep the FTS tables in sync with every write to search_key
+_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_fts(rowid, search_key)
+        VALUES (new.id, new.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, search_key)
+        VALUES ('delete', old.id, old.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF search_key ON products
+    BEGIN
+        INSERT INTO products_fts(products_fts, rowid, search_key)
+        VALUES ('delete', old.id, old.search_key);
+        INSERT INTO products_fts(rowid, search_key)
+        VALUES (new.id, new.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_fts_ai AFTER INSERT ON units
+    BEGIN
+        INSERT INTO units_fts(rowid, search_key)
+        VALUES (new.id, new.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_fts_ad AFTER DELETE ON units
+    BEGIN
+        INSERT INTO units_fts(units_fts, rowid, search_key)
+        VALUES ('delete', old.id, old.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_fts_au
+    AFTER UPDATE OF search_key ON units
+    BEGIN
+        INSERT INTO units_fts(units_fts, rowid, search_key)
+        VALUES ('delete', old.id, old.search_key);
+        INSERT INTO units_fts(rowid, search_key)
+        VALUES (new.id, new.search_key);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_trgm_ai AFTER INSERT ON products
+    BEGIN
+        INSERT INTO products_trgm(rowid, sku, title_ref)
+        VALUES (new.id, new.sku, new.title_ref);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_trgm_ad AFTER DELETE ON products
+    BEGIN
+        INSERT INTO products_trgm(products_trgm, rowid, sku, title_ref)
+        VALUES ('delete', old.id, old.sku, old.title_ref);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_trgm_au
+    AFTER UPDATE OF sku, title_ref ON products
+    BEGIN
+        INSERT INTO products_trgm(products_trgm, rowid, sku, title_ref)
+        VALUES ('delete', old.id, old.sku, old.title_ref);
+        INSERT INTO products_trgm(rowid, sku, title_ref)
+        VALUES (new.id, new.sku, new.title_ref);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_trgm_ai AFTER INSERT ON units
+    BEGIN
+        INSERT INTO units_trgm(rowid, sku, alternative_sku)
+        VALUES (new.id, new.sku, new.alternative_sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_trgm_ad AFTER DELETE ON units
+    BEGIN
+        INSERT INTO units_trgm(units_trgm, rowid, sku, alternative_sku)
+        VALUES ('delete', old.id, old.sku, old.alternative_sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS units_trgm_au
+    AFTER UPDATE OF sku, alternative_sku ON units
+    BEGIN
+        INSERT INTO units_trgm(units_trgm, rowid, sku, alternative_sku)
+        VALUES ('delete', old.id, old.sku, old.alternative_sku);
+        INSERT INTO units_trgm(rowid, sku, alternative_sku)
+        VALUES (new.id, new.sku, new.alternative_sku);
+    END
+    """,
+]
+
+# Change log read by the in-process search structures (fuzzy
+# dictionary, ...) to refresh incrementally, including across workers.
+# seq never goes backwards (AUTOINCREMENT), the log prunes itself.
+CHANGE_LOG_KEEP = 10000
+
+_CHANGE_LOG = [
+    """
+    CREATE TABLE IF NOT EXISTS search_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity TEXT NOT NULL,
+        entity_id INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS search_changes_prune
+    AFTER INSERT ON search_changes WHEN new.seq % 1000 = 0
+    BEGIN
+        DELETE FROM search_changes WHERE seq <= new.seq - {CHANGE_LOG_KEEP};
+    END
+    """,
+]
+
+# Background rebuild jobs (app.search.rebuild), kept across index
+# migrations so an interrupted job can still be resumed. Times are
+# unix seconds.
+_REBUILD_JOBS = [
+    """
+    CREATE TABLE IF NOT EXISTS search_rebuild_jobs (
+        id INTEGER PRIMARY KEY,
+        status TEXT NOT NULL,
+        phase TEXT NOT NULL,
+        last_id INTEGER NOT NULL DEFAULT 0,
+        rows_total INTEGER NOT NULL,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        rows_updated INTEGER NOT NULL DEFAULT 0,
+        run_started_at REAL NOT NULL,
+        run_start_rows INTEGER NOT NULL DEFAULT 0,
+        heartbeat_at REAL NOT NULL,
+        created_at REAL NOT NULL,
+        finished_at REAL,
+        error TEXT
+    )
+    """,
+]
+
+# (entity, table, id column) of the writes that are logged.
+# Compatibility rows are logged under their product. Categories only
+# feed the facet counts, logged so cached responses are invalidated.
+_LOGGED_TABLES = [
+    ("product", "products", "id"),
+    ("unit", "units", "id"),
+    ("component", "components", "id"),
+    ("compatibility", "product_compatibility", "product_id"),
+    ("model", "models", "id"),
+    ("make", "makes", "id"),
+    ("category", "categories", "id"),
+    ("sub_category", "sub_categories", "id"),
+]
+
+
+def _log_trigger(entity: str, table: str, id_column: str,
+                 event: str) -> str:
+    row = "old" if event == "DELETE" else "new"
+    return f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_log_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO search_changes(entity, entity_id)
+        VALUES ('{entity}', {row}.{id_column});
+    END
+    """
+
+
+_CHANGE_LOG += [
+    _log_trigger(entity, table, id_column, event)
+    for entity, table, id_column in _LOGGED_TABLES
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+_DROP = [
+    "DROP TRIGGER IF EXISTS products_search_ai",
+    "DROP TRIGGER IF EXISTS products_search_au",
+    "DROP TRIGGER IF EXISTS units_search_ai",
+    "DROP TRIGGER IF EXISTS units_search_au",
+    "DROP TRIGGER IF EXISTS product_compatibility_search_ai",
+    "DROP TRIGGER IF EXISTS product_compatibility_search_ad",
+    "DROP TRIGGER IF EXISTS product_compatibility_search_au",
+    "DROP TRIGGER IF EXISTS models_search_au",
+    "DROP TRIGGER IF EXISTS makes_search_au",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS units_fts_ai",
+    "DROP TRIGGER IF EXISTS units_fts_ad",
+    "DROP TRIGGER IF EXISTS units_fts_au",
+    "DROP TRIGGER IF EXISTS products_trgm_ai",
+    "DROP TRIGGER IF EXISTS products_trgm_ad",
+    "DROP TRIGGER IF EXISTS products_trgm_au",
+    "DROP TRIGGER IF EXISTS units_trgm_ai",
+    "DROP TRIGGER IF EXISTS units_trgm_ad",
+    "DROP TRIGGER IF EXISTS units_trgm_au",
+    "DROP TRIGGER IF EXISTS search_changes_prune",
+] + [
+    f"DROP TRIGGER IF EXISTS {table}_log_{event}"
+    for _, table, _ in _LOGGED_TABLES
+    for event in ("insert", "update", "delete")
+] + [
+    "DROP TABLE IF EXISTS products_fts",
+    "DROP TABLE IF EXISTS units_fts",
+    "DROP TABLE IF EXISTS products_trgm",
+    "DROP TABLE IF EXISTS units_trgm",
+]
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Add missing columns and indexes, then create (or migrate) the
+    FTS5 tables and their sync triggers.
+
+    Must run after Base.metadata.create_all, the triggers reference
+    the products and units tables.
+    """
+    with engine.begin() as conn:
+        for table, column, type_ in _COLUMNS:
+            existing = [
+                row[1] for row in conn.execute(
+                    text(f"PRAGMA table_info({table})"))
+            ]
+            if column not in existing:
+                conn.execute(text(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {type_}"))
+        for stmt in _INDEXES:
+            conn.execute(text(stmt))
+
+        version = conn.execute(text("PRAGMA user_version")).scalar()
+        if version == SEARCH_INDEX_VERSION:
+            return
+
+        for stmt in _DROP + _TABLES:
+            conn.execute(text(stmt))
+
+        # Recompute every search document (their definition may have
+        # changed), then index rows that already exist in the base
+        # tables. Triggers come last so this bulk pass doesn't go
+        # through them row by row.
+        backfill_search_text(conn, full=True)
+        conn.execute(text(
+            "INSERT INTO products_fts(products_fts) VALUES ('rebuild')"))
+        conn.execute(text(
+            "INSERT INTO units_fts(units_fts) VALUES ('rebuild')"))
+        conn.execute(text(
+            "INSERT INTO products_trgm(products_trgm) VALUES ('rebuild')"))
+        conn.execute(text(
+            "INSERT INTO units_trgm(units_trgm) VALUES ('rebuild')"))
+
+        for stmt in (_SEARCH_TEXT_TRIGGERS + _COMPAT_TRIGGERS + _TRIGGERS
+                     + _CHANGE_LOG + _REBUILD_JOBS):
+            conn.execute(text(stmt))
+
+        conn.execute(text(f"PRAGMA user_version = {SEARCH_INDEX_VERSION}"))
+
+
+def backfill_search_text(conn, full: bool = False) -> None:
+    """Recompute compat_text, search_text and search_key for rows
+    written while the triggers were missing (older databases, raw
+    imports), or for every row with `full`.
+    """
+    stale = "" if full else """
+        WHERE updated_at != updated_search_at OR updated_search_at IS NULL
+            OR search_key IS NULL
+    """
+    backfill_compat_text(conn)
+    conn.execute(text(f"""
+        UPDATE products SET search_text = {PRODUCT_SEARCH_TEXT},
+            search_key = {PRODUCT_SEARCH_KEY},
+            updated_search_at = updated_at
+        {stale}
+    """))
+    conn.execute(text(f"""
+        UPDATE units SET search_text = {UNIT_SEARCH_TEXT},
+            search_key = {UNIT_SEARCH_KEY},
+            updated_search_at = updated_at
+        {stale}
+    """))
+
+
+def backfill_compat_text(conn) -> None:
+    """Recompute the compat_text that differs from the fitment tables.
+
+    With the triggers in place each fix also refreshes that product's
+    search documents, through products_search_au.
+    """
+    conn.execute(text(f"""
+        UPDATE products SET compat_text = {COMPAT_TEXT}
+        WHERE compat_text IS NOT {COMPAT_TEXT}
+    """))
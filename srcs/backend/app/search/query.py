@@ -0,0 +1,233 @@
+import base64
+import json
+import re
+import unicodedata
+
+# Trigram tokens are 3 characters, shorter terms can't use the index
+TRIGRAM_MIN_LEN = 3
+
+# Ranking, added on top of the FTS5 bm25 relevance of search_key
+EXACT_SKU_BOOST = 100.0
+PROXIMITY_BOOST = 10.0
+PROXIMITY_DISTANCE = 5  # max tokens between terms for the bonus
+
+# Per searched table, the subqueries a term can be found through:
+# word prefixes in search_key, or code infixes in the trigram tables.
+# Units also match on infixes of their parent product codes.
+# Parameters are prefixed ({p}) with the table name, so a products
+# and a units query can share one statement.
+_WORD_SOURCES = {
+    "products": [
+        "products.id IN (SELECT rowid FROM products_fts "
+        "WHERE products_fts MATCH :{p}w{i})",
+    ],
+    "units": [
+        "units.id IN (SELECT rowid FROM units_fts "
+        "WHERE units_fts MATCH :{p}w{i})",
+    ],
+}
+_TRIGRAM_SOURCES = {
+    "products": [
+        "products.id IN (SELECT rowid FROM products_trgm "
+        "WHERE products_trgm MATCH :{p}g{i})",
+    ],
+    "units": [
+        "units.id IN (SELECT rowid FROM units_trgm "
+        "WHERE units_trgm MATCH :{p}g{i})",
+        "units.product_id IN (SELECT rowid FROM products_trgm "
+        "WHERE products_trgm MATCH :{p}g{i})",
+    ],
+}
+
+# Conditions for the exact-match boost, {codes} is the list of
+# upper-cased terms. SKUs are stored upper-case, so the unique indexes
+# on the code columns answer these directly.
+_EXACT_MATCHES = {
+    "products": [
+        "products.sku IN ({codes})",
+        "products.title_ref IN ({codes})",
+    ],
+    "units": [
+        "units.sku IN ({codes})",
+        "units.product_id IN (SELECT id FROM products WHERE sku IN ({codes}))",
+    ],
+}
+
+
+def fold(s: str) -> str:
+    """Lowercase and strip accents, as the FTS5 unicode61 tokenizer does"""
+    decomposed = unicodedata.normalize("NFKD", s)
+    return "".join(
+        c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+_PUNCTUATION_RE = re.compile(r"[\W_]+")
+
+
+def normalize_key(s: str | None) -> str | None:
+    """Search key form of a text: folded, punctuation runs collapsed
+    to one space. Applied to query terms; search_key is computed by the
+    triggers with normalize_key_sql, which indexes to the same tokens.
+    """
+    if s is None:
+        return None
+    return _PUNCTUATION_RE.sub(" ", fold(s)).strip()
+
+
+# Replacements normalize_key_sql applies: punctuation part titles and
+# references use, and ordinals (letters to the tokenizer, folded to
+# o/a by normalize_key). SQLite's parser limits how deep the replace()
+# chain can go inside a trigger, keep this short.
+_SQL_FOLDS = {**{c: " " for c in "-./_,()':;+"}, "º": "o", "ª": "a"}
+
+
+def _sql_literal(s: str) -> str:
+    return "'" + s.replace("'", "''") + "'"
+
+
+def normalize_key_sql(expression: str) -> str:
+    """normalize_key as a plain SQL expression, for the triggers.
+
+    No application function is involved, so writes from any SQLite
+    client (the sqlite3 shell, raw imports) keep search_key right.
+    lower() only folds ASCII: accents and any other punctuation are
+    left to the FTS5 unicode61 tokenizer, which removes them the same
+    way normalize_key does. Both give the same index tokens.
+    """
+    sql = f"lower({expression})"
+    for c, target in _SQL_FOLDS.items():
+        sql = f"replace({sql}, {_sql_literal(c)}, {_sql_literal(target)})"
+    # Separator runs became runs of spaces, each pass halves them
+    for _ in range(3):
+        sql = f"replace({sql}, '  ', ' ')"
+    return f"trim({sql})"
+
+
+def split_terms(q: str) -> list[str]:
+    """Split a user query into terms, dropping pure punctuation."""
+    return [t for t in (q or "").split() if any(c.isalnum() for c in t)]
+
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset cursor: the sort key of the last row of a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Inverse of encode_cursor, raises ValueError on garbage."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(terms: list[str]) -> str:
+    """Build an FTS5 MATCH expression: every term as a quoted prefix."""
+    return " ".join(_quote(t) + "*" for t in terms)
+
+
+class SearchQuery:
+    """Ranked full-text query over one searchable table.
+
+    Exposes SQL fragments so endpoints can compose their own SELECT:
+    - join:  LEFT JOIN bringing in the bm25 rank of each row
+    - where: every term matches, as a word prefix or a code infix
+    - score: relevance, higher is better
+    """
+
+    def __init__(self, table: str, terms: list[str]):
+        self.table = table
+        self.terms = terms
+        self.params = {}
+        p = f"{table}_"
+
+        # Word lookups go against search_key, normalized the same way
+        keys = [normalize_key(t) or t for t in terms]
+
+        conditions = []
+        for i, term in enumerate(terms):
+            sources = [s.format(i=i, p=p) for s in _WORD_SOURCES[table]]
+            self.params[f"{p}w{i}"] = build_match_query([keys[i]])
+            if len(term) >= TRIGRAM_MIN_LEN:
+                sources += [
+                    s.format(i=i, p=p) for s in _TRIGRAM_SOURCES[table]]
+                self.params[f"{p}g{i}"] = _quote(term)
+            conditions.append("(" + " OR ".join(sources) + ")")
+        self.where = " AND ".join(conditions)
+
+        # bm25 over any of the terms, rows only found through the
+        # trigram tables rank on their boosts alone
+        rank = f"{table}_rank"
+        self.params[f"{p}rank_any"] = " OR ".join(
+            build_match_query([k]) for k in keys)
+        self.join = (
+            f"LEFT JOIN (SELECT rowid, rank FROM {table}_fts "
+            f"WHERE {table}_fts MATCH :{p}rank_any) AS {rank} "
+            f"ON {rank}.rowid = {table}.id"
+        )
+
+        codes = []
+        for i, term in enumerate(terms):
+            # "EM1-25A3" style full references name both SKUs
+            parts = [term] + [c for c in term.split("-") if c]
+            for j, code in enumerate(dict.fromkeys(parts)):
+                self.params[f"{p}e{i}_{j}"] = code.upper()
+                codes.append(f":{p}e{i}_{j}")
+        exact = " OR ".join(
+            c.format(codes=", ".join(codes)) for c in _EXACT_MATCHES[table])
+
+        self.score = (
+            f"COALESCE(-{rank}.rank, 0)"
+            f" + CASE WHEN {exact} THEN {EXACT_SKU_BOOST} ELSE 0 END"
+        )
+        if len(terms) > 1:
+            self.params[f"{p}near"] = (
+                f"NEAR({build_match_query(keys)}, {PROXIMITY_DISTANCE})")
+            self.score += (
+                f" + CASE WHEN {table}.id IN (SELECT rowid FROM {table}_fts "
+                f"WHERE {table}_fts MATCH :{p}near) "
+                f"THEN {PROXIMITY_BOOST} ELSE 0 END"
+            )
+
+    def hits_sql(self, columns: str = "") -> str:
+        """SELECT of the matching rows' id, `columns` and score"""
+        t = self.table
+        return (
+            f"SELECT {t}.id{columns}, {self.score} AS score "
+            f"FROM {t} {self.join} WHERE {self.where}"
+        )
+
+    def page_sql(self, limit: int,
+                 after: list | None = None) -> tuple[str, dict]:
+        """Rows of the table with their score, best first.
+
+        `after` is the (score, id) keyset of the previous page's last
+        row, so deep pages skip straight past it instead of OFFSET.
+        """
+        t = self.table
+        params = dict(self.params)
+        sql = (
+            f"SELECT * FROM (SELECT {t}.*, {self.score} AS score "
+            f"FROM {t} {self.join} WHERE {self.where})"
+        )
+        if after:
+            sql += (
+                " WHERE score < :after_score"
+                " OR (score = :after_score AND id < :after_id)"
+            )
+            params["after_score"], params["after_id"] = after
+        sql += f" ORDER BY score DESC, id DESC LIMIT {int(limit)}"
+        return sql, params
+
+    def count_sql(self) -> str:
+        """Number of matching rows, answered from the index postings."""
+        return f"SELECT count(*) FROM {self.table} WHERE {self.where}"
@@ -0,0 +1,190 @@
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.search.index import (
+    PRODUCT_SEARCH_TEXT, UNIT_SEARCH_TEXT, PRODUCT_SEARCH_KEY,
+    UNIT_SEARCH_KEY, COMPAT_TEXT)
+
+# Rows per transaction. Each chunk holds the write lock only briefly,
+# other writers get in between chunks.
+CHUNK_SIZE = 500
+CHUNK_PAUSE = 0.01  # seconds
+
+# A running job whose heartbeat is older than this is taken to have
+# died with its worker, and the next start resumes it
+STALE_AFTER = 60.0
+
+# Tables in rebuild order, with their search document and search key
+# expressions
+_PHASES = [
+    ("products", PRODUCT_SEARCH_TEXT, PRODUCT_SEARCH_KEY),
+    ("units", UNIT_SEARCH_TEXT, UNIT_SEARCH_KEY),
+]
+
+_COLUMNS = [
+    "id", "status", "phase", "last_id", "rows_total", "rows_done",
+    "rows_updated", "run_started_at", "run_start_rows", "heartbeat_at",
+    "created_at", "finished_at", "error",
+]
+
+
+def _job(conn, job_id: int | None = None) -> dict | None:
+    sql = f"SELECT {', '.join(_COLUMNS)} FROM search_rebuild_jobs"
+    if job_id is None:
+        row = conn.execute(text(sql + " ORDER BY id DESC LIMIT 1")).first()
+    else:
+        row = conn.execute(
+            text(sql + " WHERE id = :id"), {"id": job_id}).first()
+    return dict(zip(_COLUMNS, row)) if row else None
+
+
+def start_rebuild(engine: Engine) -> tuple[int, bool]:
+    """Create a rebuild job, or claim the unfinished one.
+
+    Returns (job id, whether the caller must run it). A job that is
+    still alive in another worker is returned but not claimed. Claims
+    are single conditional writes, so two workers can't both win.
+    """
+    now = time.time()
+    with engine.begin() as conn:
+        job = conn.execute(text(
+            "SELECT id FROM search_rebuild_jobs "
+            "WHERE status != 'done' ORDER BY id DESC LIMIT 1"
+        )).scalar()
+        if job is not None:
+            claimed = conn.execute(text("""
+                UPDATE search_rebuild_jobs
+                SET status = 'running', error = NULL,
+                    run_started_at = :now, run_start_rows = rows_done,
+                    heartbeat_at = :now
+                WHERE id = :id
+                AND (status = 'failed' OR heartbeat_at < :stale)
+            """), {"id": job, "now": now, "stale": now - STALE_AFTER})
+            return job, claimed.rowcount == 1
+
+        total = sum(
+            conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            for table, _, _ in _PHASES)
+        result = conn.execute(text("""
+            INSERT INTO search_rebuild_jobs (
+                status, phase, rows_total, run_started_at, heartbeat_at,
+                created_at)
+            SELECT 'running', :phase, :total, :now, :now, :now
+            WHERE NOT EXISTS (
+                SELECT 1 FROM search_rebuild_jobs WHERE status != 'done')
+        """), {"phase": _PHASES[0][0], "total": total, "now": now})
+        if result.rowcount == 0:
+            # Lost the race to another worker's insert
+            job = conn.execute(text(
+                "SELECT max(id) FROM search_rebuild_jobs")).scalar()
+            return job, False
+        return result.lastrowid, True
+
+
+def _rebuild_chunk(conn, job: dict) -> bool:
+    """Recompute one id range of the job's current table, recording
+    progress in the same transaction. False once everything is done.
+    """
+    table, expression, key_expression = next(
+        p for p in _PHASES if p[0] == job["phase"])
+    upper = conn.execute(text(f"""
+        SELECT max(id) FROM (
+            SELECT id FROM {table} WHERE id > :last_id
+            ORDER BY id LIMIT :chunk
+        )
+    """), {"last_id": job["last_id"], "chunk": CHUNK_SIZE}).scalar()
+
+    if upper is None:
+        phases = [p[0] for p in _PHASES]
+        i = phases.index(table)
+        if i + 1 < len(phases):
+            conn.execute(text(
+                "UPDATE search_rebuild_jobs SET phase = :phase, last_id = 0 "
+                "WHERE id = :id"), {"phase": phases[i + 1], "id": job["id"]})
+            return True
+        conn.execute(text(
+            "UPDATE search_rebuild_jobs SET status = 'done', "
+            "finished_at = :now, heartbeat_at = :now WHERE id = :id"),
+            {"now": time.time(), "id": job["id"]})
+        return False
+
+    bounds = {"last_id": job["last_id"], "upper": upper}
+    scanned = conn.execute(text(
+        f"SELECT count(*) FROM {table} "
+        "WHERE id > :last_id AND id <= :upper"), bounds).scalar()
+    updated = 0
+    if table == "products":
+        # Fixing compat_text re-fires the product's search triggers
+        updated += conn.execute(text(f"""
+            UPDATE products SET compat_text = {COMPAT_TEXT}
+            WHERE id > :last_id AND id <= :upper
+            AND compat_text IS NOT {COMPAT_TEXT}
+        """), bounds).rowcount
+    # Only rows that differ are written, so the FTS and change log
+    # triggers fire for actual repairs only
+    updated += conn.execute(text(f"""
+        UPDATE {table} SET search_text = {expression},
+            search_key = {key_expression},
+            updated_search_at = updated_at
+        WHERE id > :last_id AND id <= :upper
+        AND (search_text IS NOT {expression}
+             OR search_key IS NOT {key_expression}
+             OR updated_search_at IS NOT updated_at)
+    """), bounds).rowcount
+    conn.execute(text("""
+        UPDATE search_rebuild_jobs
+        SET last_id = :upper, rows_done = rows_done + :scanned,
+            rows_updated = rows_updated + :updated, heartbeat_at = :now
+        WHERE id = :id
+    """), {"upper": upper, "scanned": scanned, "updated": updated,
+           "now": time.time(), "id": job["id"]})
+    return True
+
+
+def run_rebuild(engine: Engine, job_id: int) -> None:
+    """Run a claimed job to the end, one committed chunk at a time.
+
+    Progress is committed with each chunk, so a crash loses at most
+    one chunk and start_rebuild() picks up from last_id.
+    """
+    try:
+        while True:
+            with engine.begin() as conn:
+                if not _rebuild_chunk(conn, _job(conn, job_id)):
+                    return
+            time.sleep(CHUNK_PAUSE)
+    except Exception as e:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE search_rebuild_jobs SET status = 'failed', "
+                "error = :error WHERE id = :id"),
+                {"error": str(e), "id": job_id})
+
+
+def rebuild_status(conn, job_id: int | None = None) -> dict | None:
+    """A job's progress (the latest job by default), None if none"""
+    job = _job(conn, job_id)
+    if job is None:
+        return None
+
+    end = job["finished_at"] or job["heartbeat_at"]
+    elapsed = end - job["run_started_at"]
+    run_rows = job["rows_done"] - job["run_start_rows"]
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "phase": job["phase"],
+        "rows_total": job["rows_total"],
+        "rows_done": job["rows_done"],
+        "rows_updated": job["rows_updated"],
+        "progress": (
+            min(job["rows_done"] / job["rows_total"], 1.0)
+            if job["rows_total"] else 1.0),
+        "rows_per_sec": run_rows / elapsed if elapsed > 0 else None,
+        "stale": (
+            job["status"] == "running"
+            and job["heartbeat_at"] < time.time() - STALE_AFTER),
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"]
+    }
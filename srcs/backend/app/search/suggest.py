@@ -0,0 +1,195 @@
+import bisect
+import threading
+import time
+from sqlalchemy import text
+from app.search.changes import current_generation, changes_since
+from app.search.query import fold
+
+# How often (seconds) the watcher thread checks the change log.
+# Lookups never touch the database.
+REFRESH_INTERVAL = 1.0
+
+# Suggestion entries are (folded key, type, id, label) tuples. Names
+# are also keyed from each later word, so "veloc" finds
+# "Caixa Velocidades".
+
+
+def _word_keys(label: str) -> list[str]:
+    words = fold(label).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _product_entries(row):
+    product_id, sku, title_ref = row
+    entries = [(fold(sku), "product_sku", product_id, sku)]
+    if title_ref:
+        entries.append((fold(title_ref), "title_ref", product_id, title_ref))
+    return entries
+
+
+def _unit_entries(row):
+    unit_id, sku, product_sku = row
+    return [(fold(sku), "unit_sku", unit_id, f"{product_sku}-{sku}")]
+
+
+def _component_entries(row):
+    component_id, name = row
+    return [(k, "component", component_id, name) for k in _word_keys(name)]
+
+
+def _make_entries(row):
+    make_id, name = row
+    return [(k, "make", make_id, name) for k in _word_keys(name)]
+
+
+def _model_entries(row):
+    model_id, name, make_name = row
+    label = f"{make_name} {name}"
+    return [(k, "model", model_id, label) for k in _word_keys(label)]
+
+
+# entity -> (query, builder of the entries of one row)
+_SOURCES = {
+    "product": ("SELECT id, sku, title_ref FROM products", _product_entries),
+    "unit": (
+        "SELECT units.id, units.sku, products.sku FROM units "
+        "JOIN products ON products.id = units.product_id",
+        _unit_entries),
+    "component": ("SELECT id, name FROM components", _component_entries),
+    "make": ("SELECT id, name FROM makes", _make_entries),
+    "model": (
+        "SELECT models.id, models.name, makes.name FROM models "
+        "JOIN makes ON makes.id = models.make_id",
+        _model_entries),
+}
+
+# Id column of each source query, to reload selected rows
+_ID_COLUMNS = {
+    "product": "id",
+    "unit": "units.id",
+    "component": "id",
+    "make": "id",
+    "model": "models.id",
+}
+
+
+class SuggestIndex:
+    """Typeahead over codes and names, as one sorted array.
+
+    A prefix lookup is two bisections into the array, no database
+    round-trip. The index is built at startup and a watcher thread
+    applies writes from the search_changes log every REFRESH_INTERVAL
+    seconds, removing/inserting only the affected rows' entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._watcher = None
+        self._entries: list[tuple] = []
+        self._by_source: dict[tuple[str, int], list[tuple]] = {}
+
+    def _insert(self, key, entries):
+        self._by_source[key] = entries
+        for e in entries:
+            bisect.insort(self._entries, e)
+
+    def _delete(self, key):
+        for e in self._by_source.pop(key, ()):
+            i = bisect.bisect_left(self._entries, e)
+            if i < len(self._entries) and self._entries[i] == e:
+                del self._entries[i]
+
+    def _load_all(self, conn):
+        by_source = {}
+        for entity, (sql, build) in _SOURCES.items():
+            for row in conn.execute(text(sql)):
+                by_source[(entity, row[0])] = build(row)
+        self._by_source = by_source
+        self._entries = sorted(
+            e for entries in by_source.values() for e in entries)
+
+    def _load_changed(self, conn, changes: dict[str, set[int]]):
+        # A product SKU change relabels all its units
+        if changes.get("product"):
+            unit_ids = conn.execute(text(
+                "SELECT id FROM units WHERE product_id IN "
+                "(SELECT value FROM json_each(:ids))"
+            ), {"ids": "[" + ",".join(map(str, changes["product"])) + "]"})
+            changes.setdefault("unit", set()).update(r[0] for r in unit_ids)
+        # Make renames relabel their models
+        if changes.get("make"):
+            model_ids = conn.execute(text(
+                "SELECT id FROM models WHERE make_id IN "
+                "(SELECT value FROM json_each(:ids))"
+            ), {"ids": "[" + ",".join(map(str, changes["make"])) + "]"})
+            changes.setdefault("model", set()).update(r[0] for r in model_ids)
+
+        for entity, (sql, build) in _SOURCES.items():
+            ids = changes.get(entity)
+            if not ids:
+                continue
+            for i in ids:
+                self._delete((entity, i))
+            rows = conn.execute(text(
+                f"{sql} WHERE {_ID_COLUMNS[entity]} IN "
+                "(SELECT value FROM json_each(:ids))"
+            ), {"ids": "[" + ",".join(map(str, ids)) + "]"})
+            for row in rows:
+                self._insert((entity, row[0]), build(row))
+
+    def refresh(self, conn):
+        """Apply the writes logged since the last refresh"""
+        with self._lock:
+            generation = current_generation(conn)
+            if generation == self._generation:
+                return
+            changes = None
+            if self._generation is not None:
+                changes = changes_since(conn, self._generation)
+            if changes is None:
+                self._load_all(conn)
+            else:
+                self._load_changed(conn, changes)
+            self._generation = generation
+
+    def watch(self, engine):
+        """Refresh from a daemon thread every REFRESH_INTERVAL seconds"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(REFRESH_INTERVAL)
+                try:
+                    with engine.connect() as conn:
+                        self.refresh(conn)
+                except Exception as e:
+                    # Kept as is, retried on the next tick
+                    print(f"Suggest index refresh failed: {e}")
+
+        self._watcher = threading.Thread(
+            target=run, name="suggest-refresh", daemon=True)
+        self._watcher.start()
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        key = fold(prefix.strip())
+        if not key:
+            return []
+        results = []
+        seen = set()
+        with self._lock:
+            i = bisect.bisect_left(self._entries, (key,))
+            while i < len(self._entries) and len(results) < limit:
+                entry_key, kind, entity_id, label = self._entries[i]
+                if not entry_key.startswith(key):
+                    break
+                if (kind, entity_id) not in seen:
+                    seen.add((kind, entity_id))
+                    results.append(
+                        {"text": label, "type": kind, "id": entity_id})
+                i += 1
+        return results
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,115 @@
+from app.search.query import SearchQuery
+
+_PRODUCT_COLUMNS = [
+    "sku", "title", "title_ref", "description", "reference_price",
+    "component_ref",
+]
+_UNIT_COLUMNS = ["id", "sku", "selling_price", "status", "title_suffix"]
+
+
+def grouped_search_sql(terms: list[str], limit: int,
+                       after: list | None = None,
+                       units_per_product: int = 5) -> tuple[str, dict]:
+    """One statement returning a page of products, each with its best
+    matching units.
+
+    A product is a hit if it matches itself or through any of its
+    units, and ranks by the best of those scores. Rows come back as
+    (product_id, score, own_match, product columns..., unit_count,
+    unit columns..., unit_score), one per unit, units NULL for products
+    without any. own_match is 0 for products that matched only through
+    their units.
+    """
+    params = {"limit": int(limit), "units_per_product": units_per_product}
+    if terms:
+        products = SearchQuery("products", terms)
+        units = SearchQuery("units", terms)
+        params.update(products.params)
+        params.update(units.params)
+        hits = f"""
+            product_hits AS MATERIALIZED ({products.hits_sql()}),
+            unit_hits AS MATERIALIZED ({units.hits_sql(", units.product_id")}),
+            groups AS (
+                SELECT id, max(score) AS score, max(own) AS own_match
+                FROM (
+                    SELECT id, score, 1 AS own FROM product_hits
+                    UNION ALL
+                    SELECT product_id, score, 0 FROM unit_hits
+                ) GROUP BY id
+            )
+        """
+    else:
+        # Newest products with their newest units
+        hits = """
+            unit_hits AS (
+                SELECT units.id, units.product_id, 0.0 AS score FROM units
+            ),
+            groups AS (
+                SELECT products.id, 0.0 AS score, 1 AS own_match
+                FROM products
+            )
+        """
+
+    keyset = ""
+    if after:
+        keyset = (
+            "WHERE score < :after_score"
+            " OR (score = :after_score AND id < :after_id)"
+        )
+        params["after_score"], params["after_id"] = after
+
+    product_columns = ", ".join(f"products.{c}" for c in _PRODUCT_COLUMNS)
+    unit_columns = ", ".join(f"units.{c}" for c in _UNIT_COLUMNS)
+    sql = f"""
+        WITH {hits},
+        page AS (
+            SELECT id, score, own_match FROM groups {keyset}
+            ORDER BY score DESC, id DESC LIMIT :limit
+        ),
+        ranked_units AS (
+            SELECT unit_hits.id, unit_hits.product_id, unit_hits.score,
+                ROW_NUMBER() OVER (
+                    PARTITION BY unit_hits.product_id
+                    ORDER BY unit_hits.score DESC, unit_hits.id DESC
+                ) AS n,
+                COUNT(*) OVER (PARTITION BY unit_hits.product_id) AS total
+            FROM unit_hits JOIN page ON page.id = unit_hits.product_id
+        )
+        SELECT page.id, page.score, page.own_match, {product_columns},
+            COALESCE(ranked_units.total, 0), {unit_columns},
+            ranked_units.score
+        FROM page
+        JOIN products ON products.id = page.id
+        LEFT JOIN ranked_units ON ranked_units.product_id = page.id
+            AND ranked_units.n <= :units_per_product
+        LEFT JOIN units ON units.id = ranked_units.id
+        ORDER BY page.score DESC, page.id DESC, ranked_units.n
+    """
+    return sql, params
+
+
+def group_rows(rows) -> list[dict]:
+    """Fold the flat rows of grouped_search_sql into product groups"""
+    groups = []
+    n_product = len(_PRODUCT_COLUMNS)
+    for row in rows:
+        product_id, score, own_match = row[0], row[1], row[2]
+        if not groups or groups[-1]["product"]["id"] != product_id:
+            product = {"id": product_id}
+            product.update(zip(_PRODUCT_COLUMNS, row[3:3 + n_product]))
+            product["score"] = score
+            groups.append({
+                "product": product,
+                "units_only": not own_match,
+                "unit_count": row[3 + n_product],
+                "units": [],
+            })
+        unit_values = row[4 + n_product:-1]
+        if unit_values[0] is not None:
+            unit = dict(zip(_UNIT_COLUMNS, unit_values))
+            product = groups[-1]["product"]
+            unit["product_sku"] = product["sku"]
+            unit["full_reference"] = f"{product['sku']}-{unit['sku']}"
+            unit["score"] = row[-1]
+            groups[-1]["units"].append(unit)
+    return groups
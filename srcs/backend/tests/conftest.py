@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# The app reads its settings and opens the database at import: point
+# it at a throwaway directory before anything under app/ is imported
+_tmp = tempfile.mkdtemp(prefix="partstock-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["PHOTO_STORAGE_DIR"] = os.path.join(_tmp, "photos")
+os.environ["CSV_DATA_DIR"] = _tmp
+for name, value in {
+    "OLX_CONTACT_PHONE": "000000000",
+    "OLX_CONTACT_NAME": "Test",
+    "VAT_MULTIPLIER": "1.23",
+    "OLX_AUTH_BEARER": "test",
+    "OLX_OAUTH_CALLBACK": "http://localhost/callback",
+    "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app.main import app  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.models import (  # noqa: E402
+    Make, Model, Category, SubCategory, Component)
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def catalog():
+    """Makes, models and components the tests create products from"""
+    session = SessionLocal()
+    session.add_all([
+        Make(id=1, name="Volkswagen"),
+        Make(id=2, name="Opel"),
+        Model(id=1, make_id=1, name="Golf V", start_year=2003, end_year=2009),
+        Model(id=2, make_id=2, name="Astra H", start_year=2004,
+              end_year=2010),
+        Category(id=1, name="Motor"),
+        SubCategory(id=1, category_id=1, name="Transmissao", ref_example="EM"),
+        Component(id=1, sub_category_id=1, name="Embraiagem", ref="EM"),
+        Component(id=2, sub_category_id=1, name="Caixa Velocidades",
+                  ref="KB"),
+    ])
+    session.commit()
+    session.close()
+
+
+def create_product(client, component_ref="EM", model_ids=(1, 2),
+                   title="Kit Embraiagem completo usado", **fields):
+    response = client.post("/api/v1/products/", json={
+        "component_ref": component_ref,
+        "model_ids": list(model_ids),
+        "title": title,
+        "reference_price": 1000,
+        **fields,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters,
+                              context, executemany):
+        # The suggest index refreshes itself from a thread, every second
+        if threading.current_thread().name != "suggest-refresh":
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
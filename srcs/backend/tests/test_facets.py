@@ -0,0 +1,32 @@
+from tests.conftest import create_product
+
+
+def test_facet_counts_of_the_matching_units(client):
+    clutch = create_product(client, component_ref="EM",
+                            title="Conjunto HVBN embraiagem")
+    gearbox = create_product(client, component_ref="KB",
+                             title="Caixa HVBN cinco velocidades")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": clutch["id"], "selling_price": 1000},
+        {"product_id": clutch["id"], "selling_price": 4000,
+         "status": "sold"},
+        {"product_id": gearbox["id"], "selling_price": 30000},
+    ]})
+    assert response.status_code == 200, response.text
+
+    response = client.get("/api/v1/search/units",
+                          params={"q": "hvbn", "facets": True})
+    assert response.status_code == 200, response.text
+    facets = response.json()["facets"]
+
+    assert facets == {
+        "component_ref": {"EM": 2, "KB": 1},
+        "category": {"Motor": 3},
+        "status": {"active": 2, "sold": 1},
+        "price": {"0-25": 1, "25-50": 1, "250-500": 1},
+    }
+
+
+def test_no_facets_unless_asked(client):
+    body = client.get("/api/v1/search/units", params={"q": "hvbn"}).json()
+    assert body["facets"] is None
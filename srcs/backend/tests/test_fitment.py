@@ -0,0 +1,65 @@
+from app.models import Model, ProductCompatibility
+from tests.conftest import create_product
+
+URL = "/api/v1/search/fitment"
+
+
+def add_units(client, product_id, *statuses):
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product_id, "selling_price": 3000, "status": s}
+        for s in statuses
+    ]})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_active_units_fitting_the_vehicle(client):
+    golf = create_product(client, model_ids=(1,),
+                          title="Motor arranque so Golf V")
+    astra = create_product(client, model_ids=(2,),
+                           title="Motor arranque so Astra H")
+    active, sold = add_units(client, golf["id"], "active", "sold")
+    add_units(client, astra["id"], "active")
+
+    body = client.get(URL, params={
+        "make": "volkswagen", "model": "golf", "year": 2005}).json()
+    assert body["models"] == [{"model_id": 1, "model_name": "Golf V",
+                               "make_name": "Volkswagen",
+                               "years": "2003-2009"}]
+    ids = [r["id"] for r in body["results"]]
+    assert active["id"] in ids
+    assert sold["id"] not in ids
+    assert all(r["product_id"] != astra["id"] for r in body["results"])
+    assert body["total"] == sum(body["counts"].values())
+
+    # Outside the model's production years
+    body = client.get(URL, params={"model": "golf", "year": 2012}).json()
+    assert body["models"] == []
+    assert body["results"] == []
+
+
+def test_compatibility_written_later_is_picked_up(client, db):
+    product = create_product(client, model_ids=(2,),
+                             title="Alternador Astra depois Golf")
+    unit, = add_units(client, product["id"], "active")
+    body = client.get(URL, params={"model": "golf"}).json()
+    assert unit["id"] not in [r["id"] for r in body["results"]]
+
+    db.add(ProductCompatibility(product_id=product["id"], model_id=1))
+    db.commit()
+    body = client.get(URL, params={"model": "golf"}).json()
+    assert unit["id"] in [r["id"] for r in body["results"]]
+
+
+def test_unknown_years_are_null(client, db):
+    db.add(Model(id=3, make_id=2, name="Corsa C"))
+    db.commit()
+    product = create_product(client, model_ids=(3,),
+                             title="Bomba combustivel Corsa C")
+    add_units(client, product["id"], "active")
+
+    body = client.get(URL, params={"make": "opel", "model": "corsa"}).json()
+    assert body["models"][0]["years"] is None
+    # No production years to exclude it by
+    body = client.get(URL, params={"model": "corsa", "year": 1990}).json()
+    assert [m["model_id"] for m in body["models"]] == [3]
@@ -0,0 +1,31 @@
+from tests.conftest import create_product
+
+
+def test_misspelling_is_corrected_with_did_you_mean(client):
+    product = create_product(client, title="Amortecedor traseiro usado")
+
+    response = client.get("/api/v1/search/products",
+                          params={"q": "amortcedor trazeiro"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["did_you_mean"] == "amortecedor traseiro"
+    assert product["id"] in [r["id"] for r in body["results"]]
+
+
+def test_matching_query_is_left_alone(client):
+    create_product(client, title="Amortecedor dianteiro usado")
+
+    body = client.get("/api/v1/search/products",
+                      params={"q": "amortecedor"}).json()
+    assert body["did_you_mean"] is None
+    assert body["results"]
+
+
+def test_codes_are_not_corrected(client):
+    create_product(client, title="Bobine ignicao usada",
+                   title_ref="ZK7731")
+
+    body = client.get("/api/v1/search/products",
+                      params={"q": "ZK7732"}).json()
+    assert body["did_you_mean"] is None
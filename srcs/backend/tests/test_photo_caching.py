@@ -0,0 +1,79 @@
+import io
+import pytest
+from PIL import Image
+from tests.conftest import create_product
+
+
+@pytest.fixture(scope="module")
+def photo(client):
+    """(serving URL, bytes) of a unit photo"""
+    product = create_product(client, title="Farolim traseiro com foto")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product["id"], "selling_price": 2000}]})
+    assert response.status_code == 200, response.text
+    unit_id = response.json()[0]["id"]
+
+    out = io.BytesIO()
+    Image.new("RGB", (400, 300), "blue").save(out, "JPEG")
+    response = client.post(
+        f"/api/v1/units/{unit_id}/photos",
+        files={"file": ("photo.jpg", out.getvalue(), "image/jpeg")})
+    assert response.status_code == 200, response.text
+    listed, = client.get(f"/api/v1/units/{unit_id}/photos").json()
+    return f"/api/v1/units/photos/{listed['filename']}", out.getvalue()
+
+
+def test_full_response_carries_validators(client, photo):
+    url, data = photo
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["etag"].startswith('"')
+    assert "last-modified" in response.headers
+    assert response.headers["cache-control"] == (
+        "public, max-age=31536000, immutable")
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_matching_etag_is_a_304(client, photo):
+    url, _ = photo
+    etag = client.get(url).headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get(url, headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=100-", 100, None),
+    ("bytes=-10", -10, None),
+])
+def test_byte_ranges(client, photo, header, start, end):
+    url, data = photo
+    response = client.get(url, headers={"Range": header})
+    assert response.status_code == 206
+    expected = data[start:end + 1] if end is not None else data[start:]
+    assert response.content == expected
+    first = start if start >= 0 else len(data) + start
+    assert response.headers["content-range"] == (
+        f"bytes {first}-{first + len(expected) - 1}/{len(data)}")
+
+
+def test_unsatisfiable_range_is_a_416(client, photo):
+    url, data = photo
+    response = client.get(url, headers={"Range": f"bytes={len(data)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(data)}"
+
+
+def test_stale_if_range_gets_the_whole_file(client, photo):
+    url, data = photo
+    response = client.get(url, headers={
+        "Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == data
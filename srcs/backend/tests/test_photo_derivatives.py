@@ -0,0 +1,59 @@
+import io
+import pytest
+from PIL import Image
+from tests.conftest import create_product
+
+
+def jpeg(width, height, color="red") -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(out, "JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture(scope="module")
+def photo_url(client):
+    """Serving URL of a 2000x1000 product photo"""
+    product = create_product(client, title="Espelho retrovisor com foto")
+    response = client.post(
+        f"/api/v1/products/{product['id']}/photos",
+        files={"file": ("photo.jpg", jpeg(2000, 1000), "image/jpeg")})
+    assert response.status_code == 200, response.text
+    photo, = client.get(f"/api/v1/products/{product['id']}/photos").json()
+    return f"/api/v1/products/photos/{photo['filename']}"
+
+
+def fetch(client, url, size, accept="image/jpeg"):
+    response = client.get(url, params={"size": size},
+                          headers={"Accept": accept})
+    assert response.status_code == 200, response.text
+    return response, Image.open(io.BytesIO(response.content))
+
+
+@pytest.mark.parametrize("size,edge", [("thumb", 320), ("medium", 1024)])
+def test_sizes_are_resized_copies(client, photo_url, size, edge):
+    response, image = fetch(client, photo_url, size)
+    assert image.format == "JPEG"
+    assert image.size == (edge, edge // 2)
+    assert response.headers["vary"] == "Accept"
+
+
+def test_webp_for_clients_that_accept_it(client, photo_url):
+    _, image = fetch(client, photo_url, "thumb",
+                     accept="image/avif,image/webp,*/*")
+    assert image.format == "WEBP"
+    assert image.size == (320, 160)
+
+
+def test_original_is_served_untouched(client, photo_url):
+    _, image = fetch(client, photo_url, "original")
+    assert image.size == (2000, 1000)
+
+
+def test_non_images_are_rejected(client):
+    product = create_product(client, title="Espelho retrovisor sem foto")
+    response = client.post(
+        f"/api/v1/products/{product['id']}/photos",
+        files={"file": ("photo.jpg", b"not a jpeg", "image/jpeg")})
+    assert response.status_code == 400
+    assert client.get(
+        f"/api/v1/products/{product['id']}/photos").json() == []
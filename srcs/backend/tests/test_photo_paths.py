@@ -0,0 +1,28 @@
+import pytest
+from pathlib import Path
+from app.config import settings
+
+
+@pytest.fixture
+def outside_file():
+    # Next to the photo roots, reachable only through "../"
+    for root in (settings.PRODUCT_PHOTO_DIR, settings.UNIT_PHOTO_DIR):
+        Path(root).mkdir(parents=True, exist_ok=True)
+    path = Path(settings.PHOTO_STORAGE_DIR).parent / "secret.txt"
+    path.write_text("not a photo")
+    yield path
+    path.unlink()
+
+
+@pytest.mark.parametrize("route", ["products", "units"])
+@pytest.mark.parametrize("name", [
+    "../../secret.txt",
+    "..%2F..%2Fsecret.txt",
+    "..%2F..%2F/etc/passwd",
+    "%2Fetc%2Fpasswd",
+])
+def test_serve_photo_stays_under_root(client, outside_file, route, name):
+    response = client.get(f"/api/v1/{route}/photos/{name}")
+    assert response.status_code == 404
+    assert b"not a photo" not in response.content
+    assert b"root:" not in response.content
@@ -0,0 +1,19 @@
+from pathlib import Path
+from app.config import settings
+from app.scripts import photo_blobs
+
+
+def test_staged_olx_photos_move_to_the_photos_volume(tmp_path, monkeypatch):
+    old = tmp_path / "temp_photos"
+    old.mkdir()
+    (old / "25A1_EM1_1.jpg").write_bytes(b"jpeg bytes")
+    monkeypatch.setattr(photo_blobs, "OLD_TEMP_PHOTO_DIR", old)
+
+    photo_blobs.migrate_staging()
+    # Nothing left to do the second time
+    photo_blobs.migrate_staging()
+
+    staged = Path(settings.TEMP_PHOTO_DIR) / "25A1_EM1_1.jpg"
+    assert staged.read_bytes() == b"jpeg bytes"
+    assert not old.exists()
+    staged.unlink()
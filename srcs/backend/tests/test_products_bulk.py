@@ -0,0 +1,30 @@
+def test_bad_rows_are_reported_and_the_others_created(client):
+    row = {"component_ref": "EM", "model_ids": [1],
+           "title": "Kit Embraiagem importado", "reference_price": 1000}
+    response = client.post("/api/v1/products/bulk", json={"products": [
+        dict(row, title_ref="BULK-OK-1"),
+        dict(row, title="Curto"),
+        dict(row, model_ids=[999]),
+        dict(row, component_ref="ZZ"),
+        {"component_ref": "EM"},
+        dict(row, title_ref="BULK-OK-1"),
+        dict(row),
+    ]})
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["created"] == 2
+    assert body["failed"] == 5
+    results = body["results"]
+    assert [r["index"] for r in results] == list(range(7))
+    assert [r["ok"] for r in results] == [
+        True, False, False, False, False, False, True]
+    assert results[1]["error"].startswith("title:")
+    assert results[2]["error"] == "Model ID 999 not found"
+    assert results[3]["error"] == "Component ZZ not found"
+    assert results[4]["error"].startswith("model_ids:")
+    assert results[5]["error"] == "title_ref BULK-OK-1 already exists"
+    assert results[6]["sku"].startswith("EM")
+
+    product = client.get(f"/api/v1/products/{results[0]['id']}").json()
+    assert product["title_ref"] == "BULK-OK-1"
@@ -0,0 +1,47 @@
+import pytest
+from tests.conftest import count_queries, create_product
+
+
+def queries_for(client, url):
+    with count_queries() as statements:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def add_units(client, product_id, count):
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product_id, "selling_price": 5000}
+        for _ in range(count)
+    ]})
+    assert response.status_code == 200, response.text
+
+
+def test_product_detail_does_not_query_per_compatibility(client):
+    one = create_product(client, model_ids=(1,),
+                         title="Kit Embraiagem so um modelo")
+    two = create_product(client, model_ids=(1, 2),
+                         title="Kit Embraiagem dois modelos")
+
+    # The product with its component, then every compatibility with its
+    # model and make
+    assert queries_for(client, f"/api/v1/products/{one['id']}") == 2
+    assert queries_for(client, f"/api/v1/products/{two['id']}") == 2
+
+
+@pytest.mark.parametrize("url", [
+    "/api/v1/products/?component_ref=EM&limit=200",
+    "/api/v1/products/?component_ref=EM&sort=price_asc&limit=200",
+    "/api/v1/units/?component_ref=EM&limit=200",
+    "/api/v1/units/?status=active&sort=price_desc&limit=200",
+])
+def test_listing_query_count_does_not_grow_with_rows(client, url):
+    product = create_product(client, title="Kit Embraiagem para listar")
+    add_units(client, product["id"], 2)
+    before = queries_for(client, url)
+
+    for n in range(5):
+        product = create_product(client, title=f"Kit Embraiagem lista {n}")
+        add_units(client, product["id"], 3)
+
+    assert queries_for(client, url) == before
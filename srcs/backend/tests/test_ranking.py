@@ -0,0 +1,34 @@
+from app.search.query import EXACT_SKU_BOOST, PROXIMITY_BOOST
+from tests.conftest import create_product
+
+
+def search(client, q):
+    response = client.get("/api/v1/search/products", params={"q": q})
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_exact_sku_ranks_first(client):
+    product = create_product(client, title="Bomba travao RKTV usada")
+    # Holds the SKU as an infix of its reference, so it matches too
+    other = create_product(client, title="Bomba travao RKTV nova",
+                           title_ref=f"X{product['sku']}9")
+
+    results = search(client, product["sku"])
+    ids = [r["id"] for r in results]
+    assert ids[0] == product["id"]
+    assert other["id"] in ids
+    assert results[0]["score"] >= EXACT_SKU_BOOST
+
+
+def test_terms_close_together_rank_higher(client):
+    # Same words, so the same bm25: only their distance differs
+    near = create_product(client, title="Radiador PLXM a b c d e f g")
+    far = create_product(client, title="Radiador a b c d e f g PLXM")
+
+    results = search(client, "radiador plxm")
+    ids = [r["id"] for r in results]
+    assert ids.index(near["id"]) < ids.index(far["id"])
+    scores = {r["id"]: r["score"] for r in results}
+    assert abs(scores[near["id"]] - scores[far["id"]]
+               - PROXIMITY_BOOST) < 1e-6
@@ -0,0 +1,44 @@
+from sqlalchemy import text
+from tests.conftest import create_product
+
+URL = "/api/v1/search/units"
+
+
+def stats(client):
+    return client.get("/api/v1/search/cache-stats").json()
+
+
+def test_repeats_are_served_from_the_cache(client):
+    product = create_product(client, title="Bomba injectora CCHQ usada")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product["id"], "selling_price": 5000}]})
+    assert response.status_code == 200, response.text
+
+    first = client.get(URL, params={"q": "cchq"}).json()
+    before = stats(client)
+    # Spacing and case are normalized away
+    assert client.get(URL, params={"q": "  CCHQ "}).json() == first
+    after = stats(client)
+
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"]
+
+
+def test_category_rename_invalidates_cached_facets(client, db):
+    product = create_product(client, title="Bomba injectora FCTQ usada")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product["id"], "selling_price": 5000}]})
+    assert response.status_code == 200, response.text
+    params = {"q": "fctq", "facets": True}
+
+    facets = client.get(URL, params=params).json()["facets"]
+    assert facets["category"] == {"Motor": 1}
+
+    db.execute(text("UPDATE categories SET name = 'Motores' WHERE id = 1"))
+    db.commit()
+    try:
+        facets = client.get(URL, params=params).json()["facets"]
+        assert facets["category"] == {"Motores": 1}
+    finally:
+        db.execute(text("UPDATE categories SET name = 'Motor' WHERE id = 1"))
+        db.commit()
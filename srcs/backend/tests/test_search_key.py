@@ -0,0 +1,54 @@
+import sqlite3
+import pytest
+from app.search.query import (
+    build_match_query, normalize_key, normalize_key_sql)
+from tests.conftest import create_product
+
+SAMPLES = [
+    "Kit Embraiagem TRAVÃO",
+    "Caixa de velocidades 5v - Opel Astra H",
+    "Farol dto. (c/ regulação) nº2",
+    "Óculo traseiro; Citroën C3",
+    "ref: 0AB-123_XYZ/45",
+    "  espaços   a   mais  ",
+    "Pára-choques «frente» – usado",
+]
+
+
+def _tokens(conn, text):
+    """Terms the search FTS5 tables index for a text"""
+    conn.execute("DELETE FROM doc")
+    conn.execute("INSERT INTO doc VALUES (?)", (text,))
+    return sorted(term for (term,) in conn.execute("SELECT term FROM vocab"))
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_sql_key_indexes_like_normalize_key(text):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE VIRTUAL TABLE doc USING fts5(k, tokenize='unicode61')")
+    conn.execute("CREATE VIRTUAL TABLE vocab USING fts5vocab(doc, 'row')")
+    sql_key = conn.execute(
+        f"SELECT {normalize_key_sql('?')}", (text,)).fetchone()[0]
+    assert _tokens(conn, sql_key) == _tokens(conn, normalize_key(text))
+    assert _tokens(conn, sql_key) == sorted(set(normalize_key(text).split()))
+
+
+def test_triggers_work_without_app_functions(client, db):
+    """A plain sqlite3 connection (no functions registered by the app)
+    can write rows the search triggers handle"""
+    product = create_product(client, title="Farol esquerdo Citroën C3")
+    path = db.get_bind().url.database
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE products SET title = 'Farol direito Citroën C3' "
+                 "WHERE id = ?", (product["id"],))
+    conn.execute("UPDATE makes SET name = 'VW' WHERE id = 1")
+    conn.commit()
+    query = build_match_query(normalize_key("farol direito vw golf").split())
+    found = [row[0] for row in conn.execute(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH ?",
+        (query,))]
+    conn.execute("UPDATE makes SET name = 'Volkswagen' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert found == [product["id"]]
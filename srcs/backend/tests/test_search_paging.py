@@ -0,0 +1,55 @@
+import pytest
+from tests.conftest import create_product
+
+
+def walk(client, endpoint, q, limit):
+    """Every page of a search, following next_cursor"""
+    pages = []
+    cursor = None
+    while True:
+        params = {"q": q, "limit": limit, "with_total": True}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"/api/v1/search/{endpoint}", params=params)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = pages[-1]["next_cursor"]
+        if not cursor:
+            return pages
+
+
+def test_product_pages_cover_every_hit_once(client):
+    created = [
+        create_product(client, title=f"Sensor ABS WQZP lote {n}")
+        for n in range(7)
+    ]
+
+    pages = walk(client, "products", "wqzp", 3)
+    assert [len(p["results"]) for p in pages] == [3, 3, 1]
+    assert {p["total"] for p in pages} == {7}
+    ids = [r["id"] for p in pages for r in p["results"]]
+    assert sorted(ids) == sorted(p["id"] for p in created)
+    # Best first, across page boundaries
+    scores = [r["score"] for p in pages for r in p["results"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_unit_pages_cover_every_hit_once(client):
+    product = create_product(client, title="Sensor ABS JQVR usado")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product["id"], "selling_price": 1000 + n}
+        for n in range(5)
+    ]})
+    assert response.status_code == 200, response.text
+
+    pages = walk(client, "units", "jqvr", 2)
+    assert {p["total"] for p in pages} == {5}
+    ids = [r["id"] for p in pages for r in p["results"]]
+    assert sorted(ids) == sorted(u["id"] for u in response.json())
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "WzFd"])
+def test_bad_cursor_is_a_400(client, cursor):
+    response = client.get("/api/v1/search/products",
+                          params={"q": "sensor", "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+from app.models import Product
+from tests.conftest import create_product
+
+WORKERS = 8
+CREATES_PER_WORKER = 5
+
+
+def test_parallel_creates_get_distinct_skus(client, db):
+    def work(worker):
+        return [
+            create_product(client, component_ref="KB",
+                           title=f"Caixa velocidades lote {worker} {n}")
+            for n in range(CREATES_PER_WORKER)
+        ]
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        products = [p for batch in pool.map(work, range(WORKERS))
+                    for p in batch]
+
+    skus = [p["sku"] for p in products]
+    assert len(skus) == WORKERS * CREATES_PER_WORKER
+    assert len(set(skus)) == len(skus)
+
+
+def test_allocation_skips_ids_inserted_without_it(client, db):
+    first = create_product(client, title="Kit Embraiagem antes do import")
+
+    # Import scripts write sku_id themselves, sku_sequences is not told
+    imported = first["sku_id"] + 10
+    db.add(Product(component_ref="EM", sku_id=imported,
+                   sku=f"EM{imported}", title="Kit Embraiagem importado",
+                   reference_price=1000))
+    db.commit()
+
+    after = create_product(client, title="Kit Embraiagem depois do import")
+    assert after["sku_id"] == imported + 1
+    assert db.execute(text(
+        "SELECT last_id FROM sku_sequences "
+        "WHERE scope = 'product' AND key = 'EM'")).scalar() == imported + 1
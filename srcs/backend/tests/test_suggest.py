@@ -0,0 +1,34 @@
+from app.database import engine
+from app.search.suggest import suggest_index
+from tests.conftest import count_queries, create_product
+
+
+def suggest(client, q):
+    # Applied by the watcher thread within REFRESH_INTERVAL, done here
+    # right away
+    with engine.connect() as conn:
+        suggest_index.refresh(conn)
+    with count_queries() as statements:
+        response = client.get("/api/v1/search/suggest", params={"q": q})
+    assert response.status_code == 200, response.text
+    assert statements == []
+    return response.json()
+
+
+def test_suggest_title_ref_prefix(client):
+    product = create_product(client, title="Kit Embraiagem para sugerir",
+                             title_ref="SUGREF-0042")
+
+    assert {"text": "SUGREF-0042", "type": "title_ref",
+            "id": product["id"]} in suggest(client, "sugref-00")
+    assert suggest(client, "sugrefx") == []
+
+
+def test_suggest_names_from_a_later_word(client):
+    results = suggest(client, "veloc")
+    assert {"text": "Caixa Velocidades", "type": "component",
+            "id": 2} in results
+
+    results = suggest(client, "golf")
+    assert {"text": "Volkswagen Golf V", "type": "model",
+            "id": 1} in results
@@ -0,0 +1,30 @@
+from tests.conftest import create_product
+
+
+def search_ids(client, endpoint, q):
+    response = client.get(f"/api/v1/search/{endpoint}", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [r["id"] for r in response.json()["results"]]
+
+
+def test_reference_infix_finds_the_product(client):
+    product = create_product(client, title="Farol esquerdo xenon usado",
+                             title_ref="VAG1K0941005Q")
+
+    # Neither a prefix nor a word of the reference
+    assert product["id"] in search_ids(client, "products", "0941005")
+    assert product["id"] in search_ids(client, "products", "k0941")
+    assert product["id"] not in search_ids(client, "products", "0941006")
+
+
+def test_unit_infixes_match_its_own_and_its_product_codes(client):
+    product = create_product(client, title="Farol direito xenon usado",
+                             title_ref="VAG1K0941006Q")
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        {"product_id": product["id"], "selling_price": 9000,
+         "alternative_sku": "HELLA1EL247"}]})
+    assert response.status_code == 200, response.text
+    unit = response.json()[0]
+
+    assert unit["id"] in search_ids(client, "units", "EL247")
+    assert unit["id"] in search_ids(client, "units", "0941006")
@@ -0,0 +1,49 @@
+from tests.conftest import create_product
+
+
+def add_units(client, product_id, count, **fields):
+    response = client.post("/api/v1/units/bulk", json={"units": [
+        dict({"product_id": product_id, "selling_price": 5000}, **fields)
+        for _ in range(count)
+    ]})
+    assert response.status_code == 200, response.text
+
+
+def test_groups_count_units_and_flag_matches_through_units(client):
+    own = create_product(client, title="Alternador QZXW8812 usado")
+    via_units = create_product(client, title="Alternador recondicionado")
+    add_units(client, via_units["id"], 3, alternative_sku="QZXW8812")
+
+    response = client.get("/api/v1/search", params={
+        "q": "QZXW8812", "units_per_product": 2})
+    assert response.status_code == 200, response.text
+    groups = {g["product"]["id"]: g for g in response.json()["results"]}
+
+    assert groups[own["id"]]["units_only"] is False
+    assert groups[own["id"]]["unit_count"] == 0
+
+    group = groups[via_units["id"]]
+    assert group["units_only"] is True
+    assert group["unit_count"] == 3
+    assert len(group["units"]) == 2
+    assert {u["product_sku"] for u in group["units"]} == {via_units["sku"]}
+
+
+def test_pages_follow_the_cursor(client):
+    created = [
+        create_product(client, title=f"Motor arranque YPRQ lote {n}")
+        for n in range(5)
+    ]
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "YPRQ", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/v1/search", params=params).json()
+        seen += [g["product"]["id"] for g in page["results"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(p["id"] for p in created)
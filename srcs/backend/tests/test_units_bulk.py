@@ -0,0 +1,39 @@
+from sqlalchemy import text
+from tests.conftest import create_product
+
+URL = "/api/v1/units/bulk"
+
+
+def test_batch_gets_one_contiguous_sku_range(client):
+    product = create_product(client, title="Porta frente esquerda usada")
+    response = client.post(URL, json={"units": [
+        {"product_id": product["id"], "selling_price": 1000 + n}
+        for n in range(6)
+    ]})
+    assert response.status_code == 200, response.text
+    units = response.json()
+
+    sku_ids = [u["sku_id"] for u in units]
+    assert sku_ids == list(range(sku_ids[0], sku_ids[0] + 6))
+    assert len({u["year_month"] for u in units}) == 1
+    assert all(u["sku"] == u["year_month"] + str(u["sku_id"])
+               for u in units)
+    assert {u["product_sku"] for u in units} == {product["sku"]}
+
+
+def test_bad_rows_reject_the_whole_batch(client, db):
+    product = create_product(client, title="Porta frente direita usada")
+    before = db.execute(text("SELECT count(*) FROM units")).scalar()
+
+    response = client.post(URL, json={"units": [
+        {"product_id": product["id"], "selling_price": 1000},
+        {"product_id": 999999, "selling_price": 1000},
+        {"product_id": product["id"], "selling_price": 1000,
+         "status": "lost"},
+    ]})
+    assert response.status_code == 400
+    errors = response.json()["detail"]
+    assert [e["index"] for e in errors] == [1, 2]
+    assert errors[0]["error"] == "Product ID 999999 not found"
+
+    assert db.execute(text("SELECT count(*) FROM units")).scalar() == before